@@ -3,15 +3,53 @@ print("Running with:", sys.executable)
 
 import os
 import json
+import time
+import random
+import re
+from bisect import bisect_right
+import struct
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+import base64
+import hashlib
+import shutil
+from urllib.parse import unquote, urlparse
+import threading
+import multiprocessing
+import mmap
+import wave
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
 from io import BytesIO
 from tkinter import PhotoImage, filedialog
+from tkinter import font as tkfont
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
 
 import pygame
 from PIL import Image, ImageSequence
+
+try:
+    from pygame._sdl2 import audio as sdl2_audio     # per-device output for extra zones
+except ImportError:
+    sdl2_audio = None
 from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, APIC
+from mutagen.id3 import ID3, APIC, SYLT, USLT
+from mutagen.flac import FLAC, Picture
+from mutagen.oggvorbis import OggVorbis
+from mutagen.oggopus import OggOpus
+from mutagen.mp4 import MP4
+
+try:
+    import numpy as np       # only needed for fingerprinting / waveforms
+except ImportError:
+    np = None
+try:
+    import soundfile as sf   # seekable block decoding of FLAC/Ogg/Opus/WAV for the analysis workers
+except (ImportError, OSError):
+    sf = None
 
 from customtkinter import *
 from CTkListbox import *
@@ -22,44 +60,293 @@ from CTkListbox import *
 # =========================
 APP_DIR = os.path.dirname(__file__)
 CONFIG_FILE = os.path.join(APP_DIR, "player_config.json")
+CACHE_DIR = os.path.join(APP_DIR, "cache")
+FINGERPRINT_FILE = os.path.join(CACHE_DIR, "fingerprints-v2.json")    # bump when fingerprint_pcm changes
+WAVEFORM_DIR = os.path.join(CACHE_DIR, "waveforms")
+STATS_FILE = os.path.join(CACHE_DIR, "play_stats.json")
+LIBRARY_FILE = os.path.join(CACHE_DIR, "library.json")
+THUMB_DIR = os.path.join(CACHE_DIR, "thumbs")
+JOB_DIR = os.path.join(CACHE_DIR, "jobs")
 ART_SIZE = (300, 300)
 
 
+def read_config_data() -> dict:
+    if not os.path.exists(CONFIG_FILE):
+        return {}
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
 def save_config(music_folder: str) -> None:
+    data = read_config_data()          # keep hand-edited settings
+    data["music_folder"] = music_folder
     try:
         with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump({"music_folder": music_folder}, f)
+            json.dump(data, f)
     except OSError:
         pass
 
 
 def load_config() -> str | None:
-    if not os.path.exists(CONFIG_FILE):
-        return None
+    folder = read_config_data().get("music_folder")
+    return folder if isinstance(folder, str) else None
+
+
+def load_setting(key: str, default):
+    """Optional setting from player_config.json; falls back when missing or of the wrong type."""
+    value = read_config_data().get(key, default)
+    return value if isinstance(value, type(default)) else default
+
+
+# =========================
+# Profiling (opt-in: MP3_PLAYER_PROFILE=1 or F12)
+# =========================
+PROFILE_FILE = os.path.join(APP_DIR, "profile_dump.json")
+profiling_enabled = os.environ.get("MP3_PLAYER_PROFILE", "") not in ("", "0")
+
+
+class Histogram:
+    """Latency histogram in milliseconds with power-of-two buckets (bucket 0 is < 0.125 ms)."""
+
+    BUCKETS = 20
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float) -> None:
+        b = 0
+        edge = 0.125
+        while ms >= edge and b < self.BUCKETS - 1:
+            edge *= 2
+            b += 1
+        self.counts[b] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, p: float) -> float:
+        """Upper edge of the bucket holding the p-th percentile."""
+        if not self.count:
+            return 0.0
+        target = self.count * p / 100.0
+        seen = 0
+        for b, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(0.125 * (2 ** b), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max, 3),
+        }
+
+
+profile_hists: dict[str, Histogram] = {}
+profile_counters: dict[str, int] = {}
+
+
+def profile_record(name: str, ms: float) -> None:
+    h = profile_hists.get(name)
+    if h is None:
+        h = profile_hists[name] = Histogram()
+    h.add(ms)
+
+
+def profile_count(name: str, n: int = 1) -> None:
+    profile_counters[name] = profile_counters.get(name, 0) + n
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        profile_record(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def profile_span(name: str):
+    """`with profile_span("x"):` -- a shared no-op object when profiling is off."""
+    return _Span(name) if profiling_enabled else _NULL_SPAN
+
+
+def profiled(name: str):
+    """Decorator version of profile_span; costs one flag check when profiling is off."""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not profiling_enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile_record(name, (time.perf_counter() - t0) * 1000.0)
+        return wrapper
+    return deco
+
+
+def profile_snapshot() -> dict:
+    return {
+        "timings": {k: h.summary() for k, h in sorted(profile_hists.items())},
+        "counters": dict(sorted(profile_counters.items())),
+        "memory": {"used": memory_budget.used, "budget": memory_budget.budget, "caches": memory_budget.stats},
+    }
+
+
+def dump_profile(path: str = PROFILE_FILE) -> bool:
     try:
-        with open(CONFIG_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        folder = data.get("music_folder")
-        return folder if isinstance(folder, str) else None
-    except (json.JSONDecodeError, OSError):
-        return None
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profile_snapshot(), f, indent=2)
+        return True
+    except OSError:
+        return False
+
+
+# =========================
+# Memory budget (one byte-accounted LRU shared by every per-track cache)
+# =========================
+DEFAULT_MEMORY_BUDGET_MB = 256         # override with "memory_budget_mb" in player_config.json
+
+
+class MemoryBudget:
+    """Entries are keyed (cache name, key) and charged an approximate byte size. When the
+    total goes over budget the least recently used entry goes first, whichever cache owns it."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget = budget_bytes
+        self.entries: OrderedDict = OrderedDict()   # (name, key) -> (value, nbytes)
+        self.used = 0
+        self.stats: dict[str, dict[str, int]] = {}
+
+    def cache(self, name: str) -> "BudgetCache":
+        self.stats.setdefault(name, {"bytes": 0, "items": 0, "hits": 0, "misses": 0, "evictions": 0})
+        return BudgetCache(self, name)
+
+    def get(self, name: str, key, default=None):
+        entry = self.entries.get((name, key))
+        st = self.stats[name]
+        if entry is None:
+            st["misses"] += 1
+            return default
+        st["hits"] += 1
+        self.entries.move_to_end((name, key))
+        return entry[0]
+
+    def put(self, name: str, key, value, nbytes: int) -> None:
+        self.discard(name, key)
+        self.entries[(name, key)] = (value, nbytes)
+        self.used += nbytes
+        st = self.stats[name]
+        st["bytes"] += nbytes
+        st["items"] += 1
+        self.evict(keep=(name, key))
+
+    def discard(self, name: str, key) -> None:
+        entry = self.entries.pop((name, key), None)
+        if entry is not None:
+            self._uncharge(name, entry[1])
+
+    def charge(self, name: str, delta: int) -> None:
+        """Account for memory a consumer holds itself. It can't be evicted, so the caches shrink instead."""
+        self.used += delta
+        self.stats[name]["bytes"] += delta
+        self.evict()
+
+    def evict(self, keep=None) -> None:
+        while self.used > self.budget and self.entries:
+            (name, key), (_, nbytes) = next(iter(self.entries.items()))
+            if (name, key) == keep:
+                break                  # a single entry bigger than the budget still gets used once
+            del self.entries[(name, key)]
+            self._uncharge(name, nbytes)
+            self.stats[name]["evictions"] += 1
+
+    def set_budget(self, budget_bytes: int) -> None:
+        self.budget = max(0, budget_bytes)
+        self.evict()
+
+    def _uncharge(self, name: str, nbytes: int) -> None:
+        self.used -= nbytes
+        st = self.stats[name]
+        st["bytes"] -= nbytes
+        st["items"] -= 1
+
+
+class BudgetCache:
+    """Dict-like view of one named slice of a MemoryBudget."""
+
+    __slots__ = ("budget", "name")
+
+    def __init__(self, budget: MemoryBudget, name: str):
+        self.budget = budget
+        self.name = name
+
+    def get(self, key, default=None):
+        return self.budget.get(self.name, key, default)
+
+    def put(self, key, value, nbytes: int) -> None:
+        self.budget.put(self.name, key, value, nbytes)
+
+    def discard(self, key) -> None:
+        self.budget.discard(self.name, key)
+
+    def charge(self, delta: int) -> None:
+        self.budget.charge(self.name, delta)
+
+
+memory_budget = MemoryBudget(DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024)
 
 
 # =========================
 # Player State
 # =========================
-song_map: dict[str, str] = {}          # title -> filepath
-song_names: list[str] = []             # titles in playlist order
-song_lengths: dict[str, float] = {}    # filepath -> seconds cache
+song_map: Mapping[str, str] = {}       # title -> filepath (read-only SnapshotMap after a cold start)
+song_names: Sequence[str] = []         # titles in playlist order (SnapshotTitles after a cold start)
+library_map: Mapping[str, str] = {}    # the loaded folder (title -> filepath); playlist imports resolve against it
 
 song_queue: list[str] = []             # queued titles
 
 curr_index: int | None = None          # playlist cursor (THIS drives next/prev)
 current_song_title: str | None = None
+current_song_index: int | None = None  # playlist row of the playing track (curr_index stays put for queue plays)
+current_song_name: str | None = None   # tag title if the file has one, else display_title()
 
 current_song_length = 0.0              # seconds
 is_playing = False                     # progress is advancing?
-play_start_offset = 0.0                # seconds into song (for skip)
+play_start_offset = 0.0                # seconds into song at the last play(start=...); get_pos() counts from here
 
 status_restore_job = None
 
@@ -72,13 +359,15 @@ restore_selection_index: int | None = None  # playlist selection to restore afte
 # UI vars (filled later)
 # =========================
 window: CTk
-playlist: CTkListbox
-progress_bar: CTkProgressBar
+playlist: "PlaylistView"
+progress_bar: "WaveformBar"
 status_label: CTkLabel
 next_song_label: CTkLabel
 album_art_label: CTkLabel
 middle_gif_label: CTkLabel
 queue_display: CTkListbox
+lyrics_label: CTkLabel
+lyrics_next_label: CTkLabel
 
 placeholder_gif: "GifPlayer"
 equalizer_gif: "GifPlayer"
@@ -96,17 +385,61 @@ def display_title(full_title: str) -> str:
     return s
 
 
-def set_status(msg: str) -> None:
-    status_label.configure(text=msg)
+# ---- Render scheduler: state changes are staged and drawn at most once per frame ----
+RENDER_FRAME_MS = 16
+render_job = None
+queue_dirty = False
+next_line_dirty = False
+staged_labels: dict[CTkLabel, str] = {}
+shown_labels: dict[CTkLabel, str] = {}
+queue_rows: list[str] = []             # rows currently shown in queue_display
+
+
+def request_render() -> None:
+    global render_job
+    if render_job is None:
+        render_job = window.after(RENDER_FRAME_MS, render_ui)
+
+
+def render_ui() -> None:
+    global render_job, queue_dirty, next_line_dirty
+    render_job = None
+    with profile_span("ui.render"):
+        if queue_dirty:
+            queue_dirty = False
+            apply_listbox_rows(queue_display, queue_rows, queue_mini_rows())
+        if next_line_dirty:
+            next_line_dirty = False
+            staged_labels[next_song_label] = next_line_text()
+        for lbl, text in staged_labels.items():
+            if shown_labels.get(lbl) != text:
+                lbl.configure(text=text)
+                shown_labels[lbl] = text
+        staged_labels.clear()
+
+
+def apply_listbox_rows(box: CTkListbox, shown: list[str], rows: list[str]) -> None:
+    """Make `box` show `rows`, touching only the rows after the common prefix.
+    `shown` is the caller's record of what the box holds and is updated in place."""
+    keep = 0
+    limit = min(len(shown), len(rows))
+    while keep < limit and shown[keep] == rows[keep]:
+        keep += 1
+    if keep < len(shown):
+        box.delete(keep, "end")
+    for row in rows[keep:]:
+        box.insert("end", row)
+    shown[:] = rows
 
 
-def set_next_line(msg: str) -> None:
-    next_song_label.configure(text=msg)
+def set_status(msg: str) -> None:
+    staged_labels[status_label] = msg
+    request_render()
 
 
 def set_default_status() -> None:
     if current_song_title:
-        set_status(f"▶ {display_title(current_song_title)}")
+        set_status(f"▶ {current_song_name or display_title(current_song_title)}")
     else:
         set_status("Ready...")
 
@@ -124,97 +457,449 @@ def select_dir() -> str | None:
     return folder if folder else None
 
 
+class PlaylistView:
+    """Virtual listbox over a Sequence of titles: one canvas, and only the rows in view are drawn.
+    `rows` is a callable returning the current sequence (song_names, which may be the snapshot),
+    so a 50k-track library costs no per-track widgets and decodes only the titles on screen."""
+
+    def __init__(self, master, rows, width: int, height: int, font, fg_color: str, text_color: str,
+                 highlight_color: str, hover_color: str):
+        self.rows = rows
+        self.font = font
+        self.text_color = text_color
+        self.highlight_color = highlight_color
+        self.hover_color = hover_color
+        self.row_height = tkfont.Font(font=font).metrics("linespace") + 8
+        self.top = 0                       # first row in view
+        self.selected: int | None = None
+        self.hover: int | None = None
+        self.items: list[tuple[int, int]] = []    # (background, text) canvas items, one per visible slot
+
+        self.frame = CTkFrame(master, fg_color=fg_color, corner_radius=0)
+        self.canvas = CTkCanvas(self.frame, width=width, height=height, bg=fg_color,
+                                highlightthickness=0, bd=0)
+        self.scrollbar = CTkScrollbar(self.frame, width=12, command=self.yview)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", self._layout)
+        self.canvas.bind("<Button-1>", self._click)
+        self.canvas.bind("<Motion>", self._motion)
+        self.canvas.bind("<Leave>", lambda e: self._set_hover(None))
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence: str, command) -> None:
+        self.canvas.bind(sequence, command, add="+")
+
+    def page(self) -> int:
+        """Rows that fit fully in view."""
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def size(self) -> int:
+        return len(self.rows())
+
+    def curselection(self) -> int | None:
+        return self.selected
+
+    def selection_clear(self, first=0, last="end") -> None:
+        self.selected = None
+        self.redraw()
+
+    def selection_set(self, i: int) -> None:
+        self.selected = i
+        self.redraw()
+
+    def see(self, i: int) -> None:
+        if i < self.top:
+            self.top = i
+        elif i >= self.top + self.page():
+            self.top = i - self.page() + 1
+        self.redraw()
+
+    def reset(self) -> None:
+        """The sequence was replaced: back to the top, nothing selected."""
+        self.top = 0
+        self.selected = self.hover = None
+        self.redraw()
+
+    def scroll(self, rows: int) -> None:
+        self.top += rows
+        self.redraw()
+
+    def yview(self, action: str, value, unit: str | None = None) -> None:
+        if action == "moveto":
+            self.top = int(float(value) * self.size())
+        else:
+            self.top += int(value) * (self.page() if unit == "pages" else 1)
+        self.redraw()
+
+    def _layout(self, event=None) -> None:
+        slots = self.canvas.winfo_height() // self.row_height + 1
+        while len(self.items) < slots:
+            bg = self.canvas.create_rectangle(0, 0, 0, 0, width=0, state="hidden")
+            text = self.canvas.create_text(6, 0, anchor="w", font=self.font, fill=self.text_color, state="hidden")
+            self.items.append((bg, text))
+        self.redraw()
+
+    def redraw(self) -> None:
+        rows = self.rows()
+        n = len(rows)
+        self.top = max(0, min(self.top, n - self.page()))
+        width = self.canvas.winfo_width()
+        h = self.row_height
+        for slot, (bg, text) in enumerate(self.items):
+            i = self.top + slot
+            if i >= n:
+                self.canvas.itemconfigure(bg, state="hidden")
+                self.canvas.itemconfigure(text, state="hidden")
+                continue
+            y = slot * h
+            fill = self.highlight_color if i == self.selected else self.hover_color if i == self.hover else ""
+            self.canvas.coords(bg, 0, y, width, y + h)
+            self.canvas.itemconfigure(bg, fill=fill, state="normal" if fill else "hidden")
+            self.canvas.coords(text, 6, y + h // 2)
+            self.canvas.itemconfigure(text, text=rows[i], state="normal")
+        if n:
+            self.scrollbar.set(self.top / n, min(1.0, (self.top + self.page()) / n))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _row_at(self, y: int) -> int | None:
+        i = self.top + y // self.row_height
+        return i if 0 <= i < self.size() else None
+
+    def _click(self, event) -> None:
+        i = self._row_at(event.y)
+        if i is not None:
+            self.selection_set(i)
+
+    def _motion(self, event) -> None:
+        self._set_hover(self._row_at(event.y))
+
+    def _set_hover(self, i: int | None) -> None:
+        if i != self.hover:
+            self.hover = i
+            self.redraw()
+
+
 def playlist_size() -> int:
-    try:
-        return playlist.size()
-    except Exception:
-        return len(song_names)
+    return len(song_names)
 
 
 def playlist_get(i: int) -> str:
-    try:
-        return playlist.get(i)
-    except Exception:
-        return song_names[i]
+    return song_names[i]
 
 
-def playlist_clear() -> None:
-    playlist.delete(0, "end")
+def playlist_sync_rows() -> None:
+    """song_names was replaced: show it from the top (the view reads it, nothing is copied)."""
+    playlist.reset()
 
 
-def playlist_insert_end(text: str) -> None:
-    playlist.insert("end", text)
+def playlist_append_rows(rows: list[str]) -> None:
+    """Rows were appended to song_names (playlist import); only matters if they're in view."""
+    playlist.redraw()
 
 
 def playlist_get_selected_index() -> int | None:
-    sel = playlist.curselection()
-    if sel is None:
-        return None
-    if isinstance(sel, int):
-        return sel
-    if isinstance(sel, (tuple, list)):
-        return sel[0] if sel else None
-    return None
+    return playlist.curselection()
 
 
 def playlist_select_index(i: int) -> None:
-    # CTkListbox selection API varies by version; this covers common ones.
+    playlist.selection_set(i)
+    playlist.see(i)
+
+
+# =========================
+# Track metadata (one parse per file, shared by every consumer)
+# =========================
+class TrackMeta:
+    """Everything the player reads from a file's tags, parsed once."""
+
+    __slots__ = ("path", "mtime", "length", "title", "artist", "pictures", "gain_db", "lyric_times", "lyric_lines")
+
+    def __init__(self, path: str, mtime: float):
+        self.path = path
+        self.mtime = mtime
+        self.length = 0.0                            # seconds
+        self.title: str | None = None
+        self.artist: str | None = None
+        self.pictures: list[tuple[int, bytes]] = []  # (picture type, image bytes); 3 == front cover
+        self.gain_db: float | None = None            # ReplayGain track gain
+        self.lyric_times: list[float] = []           # synced lyrics, ascending seconds...
+        self.lyric_lines: list[str] = []             # ...and the line shown from that time on
+
+
+LRC_TIME = re.compile(r"\[(\d+):(\d+(?:[.:]\d+)?)\]")
+LRC_OFFSET = re.compile(r"\[offset:\s*([+-]?\d+)\]", re.IGNORECASE)
+
+
+def set_lyrics(meta: TrackMeta, pairs) -> None:
+    """pairs: (seconds, text). Stored sorted so the display can bisect."""
+    pairs = sorted(pairs, key=lambda p: p[0])
+    meta.lyric_times = [t for t, _ in pairs]
+    meta.lyric_lines = [text for _, text in pairs]
+
+
+def parse_lrc(text: str) -> list[tuple[float, str]]:
+    """LRC body -> (seconds, line). Lines may carry several timestamps; untimed lines are dropped."""
+    m = LRC_OFFSET.search(text)
+    offset = int(m.group(1)) / 1000.0 if m else 0.0    # positive offset = lyrics come sooner
+    pairs = []
+    for line in text.splitlines():
+        stamps = LRC_TIME.findall(line)
+        if not stamps:
+            continue
+        words = LRC_TIME.sub("", line).strip()
+        for mins, secs in stamps:
+            pairs.append((max(0.0, int(mins) * 60 + float(secs.replace(":", ".")) - offset), words))
+    return pairs
+
+
+def parse_sylt(frame) -> list[tuple[float, str]]:
+    """SYLT entries are (text, time). Timestamps in MPEG frames (format 1) can't be mapped cheaply.
+    Syllable-level frames mark new lines with a leading newline, so pieces are joined up to it."""
+    if frame.format != 2:
+        return []
+    entries = [(text, t / 1000.0) for text, t in frame.text]
+    by_syllable = any(text.startswith(("\n", "\r")) for text, _ in entries)
+    pairs: list[list] = []
+    for text, t in entries:
+        if not pairs or not by_syllable or text.startswith(("\n", "\r")):
+            pairs.append([t, text.strip()])
+        else:
+            pairs[-1][1] += text
+    return [(t, text) for t, text in pairs]
+
+
+def parse_gain(value) -> float | None:
+    """'-6.20 dB' -> -6.2"""
     try:
-        playlist.selection_clear(0, "end")
-        playlist.selection_set(i)
-        playlist.see(i)
+        return float(str(value).strip().split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def first_tag(tags, key: str) -> str | None:
+    if not tags:
+        return None
+    values = tags.get(key)
+    return str(values[0]) if values else None
+
+
+def read_mp3_meta(path: str, meta: TrackMeta) -> None:
+    audio = MP3(path, ID3=ID3)
+    meta.length = float(audio.info.length)
+    tags = audio.tags
+    if not tags:
         return
-    except Exception:
-        pass
+    meta.title = str(tags["TIT2"].text[0]) if "TIT2" in tags else None
+    meta.artist = str(tags["TPE1"].text[0]) if "TPE1" in tags else None
+    meta.pictures = [(getattr(t, "type", 0), t.data) for t in tags.values() if isinstance(t, APIC) and t.data]
+    for frame in tags.values():
+        if isinstance(frame, SYLT) and not meta.lyric_times:
+            set_lyrics(meta, parse_sylt(frame))
+    if not meta.lyric_times:
+        for frame in tags.values():
+            if isinstance(frame, USLT) and not meta.lyric_times:
+                set_lyrics(meta, parse_lrc(frame.text))   # often LRC pasted into USLT
+    for frame in tags.getall("TXXX"):
+        if frame.desc.lower() == "replaygain_track_gain" and frame.text:
+            meta.gain_db = parse_gain(frame.text[0])
+
+
+def read_vorbis_meta(audio, meta: TrackMeta) -> None:
+    """Shared by FLAC / Ogg Vorbis / Opus (all Vorbis comments)."""
+    meta.length = float(audio.info.length)
+    tags = audio.tags
+    meta.title = first_tag(tags, "title")
+    meta.artist = first_tag(tags, "artist")
+    meta.gain_db = parse_gain(first_tag(tags, "replaygain_track_gain"))
+    set_lyrics(meta, parse_lrc(first_tag(tags, "lyrics") or first_tag(tags, "unsyncedlyrics") or ""))
+    r128 = parse_gain(first_tag(tags, "r128_track_gain")) if meta.gain_db is None else None
+    if r128 is not None:
+        # Opus: Q7.8 dB relative to -23 LUFS; ReplayGain's reference is 5 dB louder
+        meta.gain_db = r128 / 256.0 + 5.0
+    for b64 in (tags.get("metadata_block_picture") or []) if tags else []:
+        try:
+            pic = Picture(base64.b64decode(b64))
+            meta.pictures.append((pic.type, pic.data))
+        except Exception:
+            continue
+
+
+def read_flac_meta(path: str, meta: TrackMeta) -> None:
+    audio = FLAC(path)
+    read_vorbis_meta(audio, meta)
+    meta.pictures.extend((p.type, p.data) for p in audio.pictures if p.data)
+
+
+def read_ogg_meta(path: str, meta: TrackMeta) -> None:
+    read_vorbis_meta(OggVorbis(path), meta)
+
+
+def read_opus_meta(path: str, meta: TrackMeta) -> None:
+    read_vorbis_meta(OggOpus(path), meta)
+
+
+def read_mp4_meta(path: str, meta: TrackMeta) -> None:
+    audio = MP4(path)
+    meta.length = float(audio.info.length)
+    tags = audio.tags
+    if not tags:
+        return
+    meta.title = first_tag(tags, "\xa9nam")
+    meta.artist = first_tag(tags, "\xa9ART")
+    meta.pictures = [(3, bytes(c)) for c in tags.get("covr", [])]
+    set_lyrics(meta, parse_lrc(first_tag(tags, "\xa9lyr") or ""))
+    gain = tags.get("----:com.apple.iTunes:replaygain_track_gain")
+    if gain:
+        meta.gain_db = parse_gain(bytes(gain[0]).decode("utf-8", "replace"))
+
+
+# file extension -> reader; scan_folder only lists what is in here
+METADATA_READERS = {
+    ".mp3": read_mp3_meta,
+    ".flac": read_flac_meta,
+    ".ogg": read_ogg_meta,
+    ".oga": read_ogg_meta,
+    ".opus": read_opus_meta,
+    ".m4a": read_mp4_meta,
+    ".mp4": read_mp4_meta,
+}
+SUPPORTED_EXTS = tuple(METADATA_READERS)
+
+track_meta = memory_budget.cache("metadata")  # filepath -> TrackMeta (durations live here too)
+
+
+def meta_nbytes(meta: TrackMeta) -> int:
+    return 512 + sum(len(data) for _, data in meta.pictures) + sum(60 + len(line) for line in meta.lyric_lines)
+
+
+def read_lrc_sidecar(path: str, meta: TrackMeta) -> None:
+    """`song.lrc` next to `song.mp3`; used when the file has no synced lyrics of its own."""
     try:
-        playlist.deselect("all")
-        playlist.select(i)
-        playlist.see(i)
-    except Exception:
+        with open(os.path.splitext(path)[0] + ".lrc", "r", encoding="utf-8-sig", errors="replace") as f:
+            set_lyrics(meta, parse_lrc(f.read()))
+    except OSError:
         pass
 
 
+def read_track_meta(path: str) -> TrackMeta:
+    """Parse without touching the cache (process-pool workers use this directly).
+    A file the reader can't handle still yields an empty record."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = 0.0
+    meta = TrackMeta(path, mtime)
+    reader = METADATA_READERS.get(os.path.splitext(path)[1].lower())
+    if reader is not None:
+        try:
+            reader(path, meta)
+        except Exception:
+            pass
+    if not meta.lyric_times:
+        read_lrc_sidecar(path, meta)
+    return meta
+
+
+@profiled("track_meta")
+def get_track_meta(path: str) -> TrackMeta:
+    meta = track_meta.get(path)
+    if meta is not None:
+        try:
+            if os.path.getmtime(path) == meta.mtime:
+                return meta
+        except OSError:
+            return meta
+    meta = read_track_meta(path)
+    track_meta.put(path, meta, meta_nbytes(meta))
+    return meta
+
+
+def known_length(path: str) -> float:
+    """Length if the file has already been parsed or is in the snapshot, else -1 (never parses)."""
+    meta = track_meta.get(path)
+    if meta is not None and meta.length > 0:
+        return meta.length
+    row = library_snapshot.row_of_path(path) if library_snapshot is not None else None
+    return float(library_snapshot.durations[row]) if row is not None else -1.0
+
+
 # =========================
 # Album Art
 # =========================
-def load_album_art(mp3_path: str, size=(300, 300)) -> CTkImage | None:
-    try:
-        audio = MP3(mp3_path, ID3=ID3)
-        if not audio.tags:
-            return None
+art_cache = memory_budget.cache("art")      # (filepath, mtime, size) -> CTkImage
 
-        apics = [t for t in audio.tags.values() if isinstance(t, APIC)]
-        if not apics:
-            return None
 
-        front = [a for a in apics if getattr(a, "type", None) == 3]  # 3 == COVER_FRONT
-        candidates = front if front else apics
+def render_album_art(pictures: list, size=ART_SIZE) -> "Image.Image | None":
+    """Pick the best embedded picture (front cover, squarest, largest) and centre-crop it to size."""
+    if not pictures:
+        return None
 
-        scored = []
-        for a in candidates:
-            try:
-                with Image.open(BytesIO(a.data)) as im:
-                    w, h = im.size
-            except Exception:
-                w = h = 0
+    front = [p for p in pictures if p[0] == 3]  # 3 == COVER_FRONT
+    candidates = front if front else pictures
 
-            squareness = (min(w, h) / max(w, h)) if max(w, h) else 0.0
-            pixels = w * h
-            byte_len = len(a.data) if a.data else 0
-            scored.append((squareness, pixels, byte_len, a))
+    scored = []
+    for _, data in candidates:
+        try:
+            with Image.open(BytesIO(data)) as im:
+                w, h = im.size
+        except Exception:
+            w = h = 0
 
-        scored.sort(reverse=True)
-        chosen = scored[0][3]
+        squareness = (min(w, h) / max(w, h)) if max(w, h) else 0.0
+        pixels = w * h
+        scored.append((squareness, pixels, len(data), data))
 
-        img = Image.open(BytesIO(chosen.data)).convert("RGB")
+    scored.sort(key=lambda t: t[:3], reverse=True)
+    chosen = scored[0][3]
+
+    img = Image.open(BytesIO(chosen)).convert("RGB")
+
+    tw, th = size
+    w, h = img.size
+    side = min(w, h)
+    img = img.crop(((w - side) // 2, (h - side) // 2, (w + side) // 2, (h + side) // 2))
+    return img.resize((tw, th))
 
-        tw, th = size
-        w, h = img.size
-        side = min(w, h)
-        img = img.crop(((w - side) // 2, (h - side) // 2, (w + side) // 2, (h + side) // 2))
-        img = img.resize((tw, th))
 
-        return CTkImage(img, size=size)
+def thumb_cache_path(path: str, mtime: float) -> str:
+    """Thumbnails are keyed by path and mtime, so a retagged file never hits a stale one."""
+    key = f"{path}\0{mtime!r}".encode("utf-8", "surrogateescape")
+    return os.path.join(THUMB_DIR, hashlib.sha1(key).hexdigest() + ".jpg")
+
+
+@profiled("load_album_art")
+def load_album_art(path: str, size=ART_SIZE) -> CTkImage | None:
+    try:
+        meta = get_track_meta(path)
+        key = (path, meta.mtime, tuple(size))
+        cached = art_cache.get(key)
+        if cached is not None:
+            return cached
+
+        img = None
+        if tuple(size) == ART_SIZE:
+            try:
+                with Image.open(thumb_cache_path(path, meta.mtime)) as im:
+                    img = im.convert("RGB")
+            except OSError:
+                pass
+        if img is None:
+            img = render_album_art(meta.pictures, size)
+        if img is None:
+            return None
+
+        tw, th = size
+        art = CTkImage(img, size=size)
+        art_cache.put(key, art, tw * th * 3 * 2)     # PIL copy + Tk photo
+        return art
     except Exception:
         return None
 
@@ -222,23 +907,45 @@ def load_album_art(mp3_path: str, size=(300, 300)) -> CTkImage | None:
 # =========================
 # GIF Player (freeze-frame control lives here)
 # =========================
-def load_gif_frames_and_delays(path: str, size: tuple[int, int]) -> tuple[list[CTkImage], list[int]]:
-    frames: list[CTkImage] = []
-    delays: list[int] = []
-    im = Image.open(path)
-    for frame in ImageSequence.Iterator(im):
-        delay = max(20, int(frame.info.get("duration", 80)))
-        pil = frame.convert("RGBA").resize(size)
-        frames.append(CTkImage(pil, size=size))
-        delays.append(delay)
-    return frames, delays
+gif_frame_cache = memory_budget.cache("gif_frames")   # (path, size, index) -> CTkImage
+
+
+def load_gif_delays(path: str) -> list[int]:
+    """Frame delays only; the frames themselves are decoded on demand into gif_frame_cache."""
+    with Image.open(path) as im:
+        return [max(20, int(frame.info.get("duration", 80))) for frame in ImageSequence.Iterator(im)]
+
+
+def gif_frame_nbytes(size: tuple[int, int]) -> int:
+    return size[0] * size[1] * 4 * 2             # PIL copy + Tk photo
+
+
+def load_gif_frames(path: str, size: tuple[int, int]) -> None:
+    """Decode every frame in one pass (GIF frames can only be reached sequentially anyway)."""
+    nbytes = gif_frame_nbytes(size)
+    with Image.open(path) as im:
+        for idx, frame in enumerate(ImageSequence.Iterator(im)):
+            pil = frame.convert("RGBA").resize(size)
+            gif_frame_cache.put((path, size, idx), CTkImage(pil, size=size), nbytes)
+
+
+def load_gif_frame(path: str, size: tuple[int, int], idx: int) -> CTkImage:
+    """Decode one frame; used when the whole GIF wouldn't survive in the budget."""
+    with Image.open(path) as im:
+        im.seek(idx)
+        frame = CTkImage(im.convert("RGBA").resize(size), size=size)
+    gif_frame_cache.put((path, size, idx), frame, gif_frame_nbytes(size))
+    return frame
 
 
 class GifPlayer:
     def __init__(self, tk_root: CTk, target_label: CTkLabel, path: str, size: tuple[int, int]):
         self.tk_root = tk_root
         self.target_label = target_label
-        self.frames, self.delays = load_gif_frames_and_delays(path, size)
+        self.path = path
+        self.size = size
+        self.delays = load_gif_delays(path)
+        self.frame_count = len(self.delays)
 
         self.job = None
         self._seq = []
@@ -254,14 +961,23 @@ class GifPlayer:
         self.pause_frame_index = 0
 
     def _sanitize_seq(self, seq):
-        if not self.frames:
+        if not self.frame_count:
             return []
-        n = len(self.frames)
+        n = self.frame_count
         out = [i for i in seq if 0 <= i < n]
         return out
 
     def _show_frame(self, idx: int):
-        frame = self.frames[idx]
+        key = (self.path, self.size, idx)
+        frame = gif_frame_cache.get(key)
+        if frame is None:
+            # a full pass only pays off if the frames can stay cached; under a tight budget
+            # it would evict its own frames and repeat on every step
+            if self.frame_count * gif_frame_nbytes(self.size) <= memory_budget.budget // 2:
+                load_gif_frames(self.path, self.size)
+                frame = gif_frame_cache.get(key)
+            if frame is None:
+                frame = load_gif_frame(self.path, self.size, idx)
         self.target_label.configure(image=frame)
         self.target_label.image = frame
 
@@ -282,7 +998,8 @@ class GifPlayer:
 
         def step():
             idx = self._seq[self._pos]
-            self._show_frame(idx)
+            with profile_span("gif.step"):
+                self._show_frame(idx)
 
             delay = self.delays[idx] if idx < len(self.delays) else 80
 
@@ -305,7 +1022,7 @@ class GifPlayer:
     def start(self, mode="running"):
         # If you never configured sequences, just animate all frames.
         if self.seq_running is None:
-            self.play_sequence(list(range(len(self.frames))), loop=True)
+            self.play_sequence(list(range(self.frame_count)), loop=True)
             return
 
         if mode == "startup_then_running" and self.seq_startup:
@@ -328,13 +1045,98 @@ class GifPlayer:
             self.tk_root.after_cancel(self.job)
             self.job = None
 
-        if not self.frames:
+        if not self.frame_count:
             return
 
-        idx = max(0, min(self.pause_frame_index, len(self.frames) - 1))
+        idx = max(0, min(self.pause_frame_index, self.frame_count - 1))
         self._show_frame(idx)
 
 
+# =========================
+# Waveform seekbar
+# =========================
+class WaveformBar:
+    """Drop-in for the old CTkProgressBar: set(fraction) only moves two canvas items,
+    the waveform itself is one polygon redrawn once per track."""
+
+    def __init__(self, master, width: int, height: int, on_seek=None):
+        self.width = width
+        self.height = height
+        self.on_seek = on_seek
+        self._x = -1
+
+        self.canvas = CTkCanvas(
+            master, width=width, height=height, bg="black",
+            highlightthickness=1, highlightbackground="#00FF00",
+        )
+        mid = height / 2
+        self.wave = self.canvas.create_polygon(0, mid, width, mid, width, mid, fill="#006633", outline="#00AA55")
+        self.played = self.canvas.create_rectangle(0, height - 3, 0, height, fill="#00FF00", width=0)
+        self.head = self.canvas.create_line(0, 0, 0, height, fill="#00FF00")
+        self.canvas.bind("<Button-1>", self._click)
+
+    def pack(self, **kwargs):
+        self.canvas.pack(**kwargs)
+
+    def set(self, fraction: float) -> None:
+        x = int(max(0.0, min(fraction, 1.0)) * self.width)
+        if x == self._x:
+            return
+        self._x = x
+        self.canvas.coords(self.played, 0, self.height - 3, x, self.height)
+        self.canvas.coords(self.head, x, 0, x, self.height)
+
+    def set_peaks(self, peaks) -> None:
+        """peaks: (n, 2) int8 min/max array, or None for a flat line."""
+        mid = self.height / 2
+        if peaks is None or len(peaks) < 2:
+            self.canvas.coords(self.wave, 0, mid, self.width, mid, self.width, mid)
+            return
+        n = len(peaks)
+        scale = (self.height / 2 - 2) / 128.0
+        step = self.width / (n - 1)
+        xs = [i * step for i in range(n)]
+        top = [c for i in range(n) for c in (xs[i], mid - int(peaks[i][1]) * scale)]
+        bottom = [c for i in range(n - 1, -1, -1) for c in (xs[i], mid - int(peaks[i][0]) * scale)]
+        self.canvas.coords(self.wave, *top, *bottom)
+
+    def _click(self, event) -> None:
+        if self.on_seek is not None and self.width > 0:
+            self.on_seek(max(0.0, min(event.x / self.width, 1.0)))
+
+
+waveforms = memory_budget.cache("waveforms")   # filepath -> peaks (memory copy of the disk cache)
+waveform_path: str | None = None       # track the seekbar is (or will be) showing
+
+
+def show_waveform(path: str) -> None:
+    global waveform_path
+    waveform_path = path
+
+    peaks = waveforms.get(path)
+    if peaks is None and np is not None:
+        peaks = load_cached_waveform(path)
+        if peaks is not None:
+            waveforms.put(path, peaks, peaks.nbytes)
+    progress_bar.set_peaks(peaks)
+
+    if peaks is None and np is not None:
+        future = submit_to_pool(compute_waveform, path)
+        when_done(future, lambda f: waveform_ready(path, f))
+
+
+def waveform_ready(path: str, future) -> None:
+    try:
+        peaks = future.result()
+    except Exception:
+        return
+    if peaks is None:
+        return
+    waveforms.put(path, peaks, peaks.nbytes)
+    if path == waveform_path:
+        progress_bar.set_peaks(peaks)
+
+
 def start_placeholder_gif() -> None:
     placeholder_gif.start()
 
@@ -343,6 +1145,65 @@ def stop_placeholder_gif() -> None:
     placeholder_gif.stop()
 
 
+# =========================
+# Playback clock
+# =========================
+CLOCK_MAX_DRIFT = 0.25                 # seconds before the clock is re-anchored to the mixer
+
+
+class PlaybackClock:
+    """Stream position in seconds, read with no mixer call: a monotonic clock anchored on
+    play/seek/pause/resume. pygame's get_pos() is accumulated from bytes handed to the device
+    in its post-mix callback, so update_progress feeds it to correct() once per tick; that
+    pulls the clock back after an underrun or a stall instead of letting it run ahead."""
+
+    __slots__ = ("anchor_pos", "anchor_t", "running", "loaded")
+
+    def __init__(self):
+        self.stop()
+
+    def stop(self) -> None:
+        self.anchor_pos = 0.0
+        self.anchor_t = time.monotonic()
+        self.running = False
+        self.loaded = False
+
+    def start(self, pos: float = 0.0) -> None:
+        self.anchor_pos = pos
+        self.anchor_t = time.monotonic()
+        self.running = True
+        self.loaded = True
+
+    def seek(self, pos: float) -> None:
+        self.anchor_pos = pos
+        self.anchor_t = time.monotonic()
+        self.loaded = True
+
+    def pause(self) -> None:
+        self.anchor_pos = self.position()
+        self.anchor_t = time.monotonic()
+        self.running = False
+
+    def resume(self) -> None:
+        if self.loaded and not self.running:
+            self.anchor_t = time.monotonic()
+            self.running = True
+
+    def position(self) -> float:
+        if self.running:
+            return self.anchor_pos + (time.monotonic() - self.anchor_t)
+        return self.anchor_pos
+
+    def correct(self, delivered_pos: float) -> None:
+        if self.running and abs(self.position() - delivered_pos) > CLOCK_MAX_DRIFT:
+            profile_count("clock.corrections")
+            self.anchor_pos = delivered_pos
+            self.anchor_t = time.monotonic()
+
+
+playback_clock = PlaybackClock()
+
+
 # =========================
 # Audio + Playback
 # =========================
@@ -356,23 +1217,52 @@ def ensure_audio() -> bool:
         return False
 
 
+@profiled("scan_folder")
 def scan_folder(folder: str) -> dict[str, str]:
     if not folder or not os.path.isdir(folder):
         return {}
-    mp3_files = [f for f in os.listdir(folder) if f.lower().endswith(".mp3")]
-    return {f[:-4]: os.path.join(folder, f) for f in mp3_files}
+    found: dict[str, str] = {}
+    for f in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(f)
+        if ext.lower() not in SUPPORTED_EXTS:
+            continue
+        title = stem if stem not in found else f"{stem} ({ext[1:].lower()})"
+        found[title] = os.path.join(folder, f)
+    return found
+
+
+def load_json_cache(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_json_cache(path: str, data: dict) -> None:
+    """Write via a temp file so an interrupted save never leaves half a cache behind."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
 
 
-def load_music_from_folder(folder: str) -> None:
-    global song_map, song_names, curr_index
+def set_library(mapping, names) -> None:
+    """Replace the whole playlist (folder scan or snapshot)."""
+    global song_map, song_names, library_map, curr_index
 
-    song_map = scan_folder(folder)
-    song_names = list(song_map.keys())
+    cancel_playlist_import()
+    song_map = library_map = mapping
+    song_names = names
     curr_index = 0 if song_names else None
+    reset_play_modes()
 
-    playlist_clear()
-    for name in song_names:
-        playlist_insert_end(name)
+    playlist_sync_rows()
 
     refresh_queue_mini()
     update_next_line()
@@ -380,7 +1270,25 @@ def load_music_from_folder(folder: str) -> None:
     if song_names:
         flash_status(f"Loaded {len(song_names)} songs.", 2000)
     else:
-        flash_status("No MP3s found in that folder.", 2500)
+        flash_status("No music found in that folder.", 2500)
+
+
+def load_music_from_folder(folder: str, read_tags: bool = True) -> None:
+    """Scan and show the folder. With read_tags, tracks whose tags aren't in library.json (or
+    changed since) are read in the background, which fills the snapshot's lengths."""
+    mtime = folder_mtime(folder)        # taken before the scan, so changes during it invalidate
+    found = scan_folder(folder)
+    set_library(found, list(found.keys()))
+    if mtime is None:
+        return
+    install_library_snapshot(folder, mtime, song_names, list(found.values()))
+    snap = library_snapshot
+    if read_tags and snap is not None and active_job is None:
+        info = get_library_info()
+        stale = [path for i, path in enumerate(map(snap.path, range(snap.n)))
+                 if (info.get(path) or {}).get("mtime") != snap.mtimes[i]]
+        if stale:
+            start_library_job("tags", stale)
 
 
 def load_music_button() -> None:
@@ -392,84 +1300,524 @@ def load_music_button() -> None:
     load_music_from_folder(folder)
 
 
-def play_music(file_path: str) -> None:
-    global current_song_length, is_playing, play_start_offset
+def play_music(file_path: str) -> bool:
+    """Start the file on the main mixer; False (status already flashed) if it can't be played."""
+    global current_song_length, current_gain_db, is_playing, play_start_offset
 
     if not ensure_audio():
-        return
+        return False
 
     if not os.path.exists(file_path):
         flash_status("File not found.", 2500)
-        return
+        return False
 
     play_start_offset = 0.0
     progress_bar.set(0)
 
-    if file_path in song_lengths:
-        current_song_length = song_lengths[file_path]
-    else:
+    with profile_span("play_music.length_probe"):
+        meta = get_track_meta(file_path)
+        if meta.length <= 0:
+            # tags gave nothing usable: fall back to decoding the file once
+            try:
+                meta.length = float(pygame.mixer.Sound(file_path).get_length())
+            except pygame.error:
+                meta.length = 0.0
+        current_song_length = meta.length
+        current_gain_db = meta.gain_db if meta.gain_db is not None else analysed_gain_db(file_path, meta.mtime)
+
+    with profile_span("play_music.load"):
         try:
-            sound = pygame.mixer.Sound(file_path)
-            current_song_length = float(sound.get_length())
-            song_lengths[file_path] = current_song_length
+            pygame.mixer.music.load(file_path)
         except pygame.error:
-            current_song_length = 0.0
-
-    pygame.mixer.music.load(file_path)
-    pygame.mixer.music.play()
+            flash_status("Can't play this format.", 2500)
+            return False
+        pygame.mixer.music.set_volume(effective_volume())
+        pygame.mixer.music.play()
+    reset_mixer_stall()
+    playback_clock.start(0.0)
     is_playing = True
+    return True
 
 
 # =========================
-# Queue (single source of truth)
+# Analysis workers (run inside the process pool)
 # =========================
-def refresh_queue_mini() -> None:
-    queue_display.delete(0, "end")
-    if not song_queue:
-        queue_display.insert("end", "(queue empty)")
-        return
+DECODE_RATE = 11025                    # workers decode to mono at this rate
+FP_WINDOW_SEC = 12.0
+FP_FRAME = 1024
+FP_BITS = 64
+FP_BAND_HZ = (60, 4000)                # spectrum range every codec keeps
+FP_BAND_COUNT = 24
+# Tuned on WAV masters vs 128/64 kbps MP3 re-encodes (plus pygame's house_lo mp3/ogg/wav):
+# re-encodes sit at 0-10 bits (95% <= 7), unrelated tracks at 8+ (99% >= 11).
+FP_MAX_HAMMING = 8
+FP_BANDS = 3                           # LSH bands of up to ceil(FP_BITS / FP_BANDS) bits; wide keys keep buckets sparse
+FP_PROBE_RADIUS = FP_MAX_HAMMING // FP_BANDS   # pigeonhole: a match differs by at most this in some band
+FP_MAX_LENGTH_DIFF = 2.0               # seconds
+WAVE_BUCKETS = 400
+WAVE_CHUNK_BYTES = 256 * 1024
+WAVE_BLOCK_SEC = 10.0                  # decoded per block when reading through soundfile
+SEEKABLE_EXTS = (".flac", ".ogg", ".opus", ".wav")   # what libsndfile can seek in; M4A is decoded whole
+
+_fp_tables = None
+
+
+def init_decode_worker() -> None:
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    pygame.mixer.init(frequency=DECODE_RATE, size=-16, channels=1)
+
+
+def mp3_audio_span(path: str) -> tuple[int, int]:
+    """Byte range holding MPEG frames, skipping an ID3v2 header and ID3v1 footer."""
+    size = os.path.getsize(path)
+    start, end = 0, size
+    with open(path, "rb") as f:
+        head = f.read(10)
+        if len(head) == 10 and head[:3] == b"ID3":
+            start = 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+            if head[5] & 0x10:
+                start += 10
+        if size - start >= 128:
+            f.seek(size - 128)
+            if f.read(3) == b"TAG":
+                end = size - 128
+    return start, max(start, end)
+
+
+_MP3_BITRATES = {
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # MPEG-1 layer III
+    (2, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),       # MPEG-2/2.5 layer III
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_frame_len(data: bytes, i: int) -> int:
+    """Length of the layer III frame whose header starts at i, or 0 if it isn't one."""
+    if i + 4 > len(data) or data[i] != 0xFF or (data[i + 1] & 0xE0) != 0xE0:
+        return 0
+    version = (data[i + 1] >> 3) & 3
+    layer = (data[i + 1] >> 1) & 3
+    br_idx = data[i + 2] >> 4
+    sr_idx = (data[i + 2] >> 2) & 3
+    if version == 1 or layer != 1 or br_idx in (0, 15) or sr_idx == 3:
+        return 0
+    bitrate = _MP3_BITRATES[(3 if version == 3 else 2, 1)][br_idx] * 1000
+    rate = _MP3_RATES[version][sr_idx]
+    padding = (data[i + 2] >> 1) & 1
+    return (144 if version == 3 else 72) * bitrate // rate + padding
+
+
+def find_mp3_sync(data: bytes) -> int:
+    """Offset of the first frame header that is followed by another one (-1 if none)."""
+    i = data.find(b"\xff")
+    while 0 <= i < len(data) - 4:
+        n = _mp3_frame_len(data, i)
+        if n and _mp3_frame_len(data, i + n):
+            return i
+        i = data.find(b"\xff", i + 1)
+    return -1
+
+
+def decode_pcm(data) -> "np.ndarray":
+    """Decode an in-memory file (or file path) to mono int16 at DECODE_RATE."""
+    sound = pygame.mixer.Sound(file=BytesIO(data)) if isinstance(data, bytes) else pygame.mixer.Sound(data)
+    return np.frombuffer(sound.get_raw(), dtype=np.int16)
+
+
+def open_seekable(path: str) -> "sf.SoundFile | None":
+    if sf is None or not path.lower().endswith(SEEKABLE_EXTS):
+        return None
+    try:
+        return sf.SoundFile(path)
+    except Exception:                      # e.g. a libsndfile built without Opus
+        return None
 
-    MAX_ITEMS = 3
-    for title in song_queue[:MAX_ITEMS]:
-        queue_display.insert("end", display_title(title))
-    if len(song_queue) > MAX_ITEMS:
-        queue_display.insert("end", f"... +{len(song_queue) - MAX_ITEMS}")
 
+def decode_frames(snd: "sf.SoundFile", frames: int) -> "np.ndarray | None":
+    """Read the next `frames` from a soundfile and decode them like decode_pcm. They go through
+    pygame as a WAV so the resampling matches the MP3 path and fingerprints stay comparable."""
+    data = snd.read(frames, dtype="int16")
+    if not len(data):
+        return None
+    buf = BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(snd.channels)
+        w.setsampwidth(2)
+        w.setframerate(snd.samplerate)
+        w.writeframes(data.tobytes())
+    return decode_pcm(buf.getvalue())
+
+
+def decode_window(path: str, length: float, start_frac: float, seconds: float) -> "np.ndarray | None":
+    """Decode roughly `seconds` of audio starting `start_frac` into the track.
+    MP3s are cut at the byte level (average bytes/s from `length`) and SEEKABLE_EXTS are seeked
+    through soundfile, so only the window is decoded; anything else is decoded whole."""
+    try:
+        if path.lower().endswith(".mp3"):
+            start, end = mp3_audio_span(path)
+            bytes_per_sec = (end - start) / length if length > 0 else 16000
+            want = int(bytes_per_sec * seconds)
+            offset = start + int(max(0, end - start - want) * start_frac)
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(min(want, end - offset))
+            sync = find_mp3_sync(data)
+            if sync < 0:
+                return None
+            return decode_pcm(data[sync:])
+
+        snd = open_seekable(path)
+        if snd is not None:
+            with snd:
+                want = int(seconds * snd.samplerate)
+                snd.seek(int(max(0, snd.frames - want) * start_frac))
+                return decode_frames(snd, want)
+
+        pcm = decode_pcm(path)
+        n = int(seconds * DECODE_RATE)
+        off = int(max(0, len(pcm) - n) * start_frac)
+        return pcm[off:off + n]
+    except Exception:
+        return None
 
-def update_next_line() -> None:
-    if song_queue:
-        set_next_line(f"Next: {display_title(song_queue[0])}")
-        return
 
-    if playlist_size() == 0 or curr_index is None:
-        set_next_line("No songs queued.")
+def fingerprint_pcm(pcm: "np.ndarray") -> int | None:
+    """64-bit simhash of the window's log band-energy profile (mean + spread per band).
+    Shift-invariant, so copies cut a little differently or re-encoded still land close.
+    Each profile has its level and overall tilt removed first, so the hyperplanes split
+    tracks on spectral shape rather than on the slope that all music shares."""
+    global _fp_tables
+    n = len(pcm) // FP_FRAME
+    if n < 8:
+        return None
+    if _fp_tables is None:
+        lo, hi = (int(hz * FP_FRAME / DECODE_RATE) for hz in FP_BAND_HZ)
+        edges = np.unique(np.geomspace(lo, hi, FP_BAND_COUNT + 1).astype(int))
+        ramp = np.arange(len(edges) - 1) - (len(edges) - 2) / 2
+        planes = np.random.default_rng(0x5EED).standard_normal((FP_BITS, 2 * (len(edges) - 1)))
+        _fp_tables = (edges, ramp, np.hanning(FP_FRAME).astype(np.float32), planes)
+    edges, ramp, win, planes = _fp_tables
+
+    def flatten(v):
+        v = v - v.mean()
+        v = v - ramp * (v @ ramp) / (ramp @ ramp)
+        return v / (np.sqrt((v * v).mean()) + 1e-9)
+
+    frames = pcm[:n * FP_FRAME].astype(np.float32).reshape(n, FP_FRAME) * win
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    floor = 1e-3 * power.sum(axis=1, keepdims=True) / (len(edges) - 1)    # keeps near-silent bands from flapping
+    bands = np.log(np.add.reduceat(power[:, :edges[-1]], edges[:-1], axis=1) + floor + 1e-9)
+    feat = np.concatenate([flatten(bands.mean(axis=0)), flatten(bands.std(axis=0))])
+    bits = (planes @ feat) > 0
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def job_fingerprint(path: str) -> list:
+    """Library job worker: [mtime, length, fingerprint hex or None]."""
+    mtime = os.path.getmtime(path)
+    length = read_track_meta(path).length
+    pcm = decode_window(path, length, 0.35, FP_WINDOW_SEC)
+    fp = fingerprint_pcm(pcm) if pcm is not None else None
+    return [mtime, length, f"{fp:016x}" if fp is not None else None]
+
+
+def iter_pcm_blocks(path: str):
+    """Yield decoded mono int16 blocks. MP3s are decoded WAVE_CHUNK_BYTES of frames at a
+    time and SEEKABLE_EXTS WAVE_BLOCK_SEC at a time, so memory stays bounded; other formats
+    (M4A, or everything without soundfile) are decoded in one go."""
+    if not path.lower().endswith(".mp3"):
+        snd = open_seekable(path)
+        if snd is None:
+            yield decode_pcm(path)
+            return
+        with snd:
+            while (block := decode_frames(snd, int(WAVE_BLOCK_SEC * snd.samplerate))) is not None:
+                yield block
         return
 
-    nxt = (curr_index + 1) % playlist_size()
-    set_next_line(f"Next: {display_title(playlist_get(nxt))}")
+    start, end = mp3_audio_span(path)
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        carry = b""
+        while pos < end or carry:
+            chunk = f.read(min(WAVE_CHUNK_BYTES, end - pos))
+            pos += len(chunk)
+            data = carry + chunk
+            carry = b""
+
+            sync = find_mp3_sync(data)
+            if sync < 0:
+                if not chunk:
+                    return
+                carry = data[-4096:]       # a frame may straddle the chunk edge
+                continue
+            # cut after the last whole frame; the partial one rides along to the next chunk
+            cut = sync
+            while True:
+                n = _mp3_frame_len(data, cut)
+                if not n or cut + n > len(data):
+                    break
+                cut += n
+            if chunk and cut < len(data):
+                carry = data[cut:]
+            if cut > sync:
+                yield decode_pcm(data[sync:cut])
+            if not chunk:
+                return
+
+
+def compute_waveform(path: str, buckets: int = WAVE_BUCKETS) -> "np.ndarray | None":
+    """Worker entry point: per-bucket (min, max) peaks as int8, also written to the disk cache."""
+    try:
+        mtime = os.path.getmtime(path)
+        length = read_track_meta(path).length
+        per_bucket = max(1, int(length * DECODE_RATE) // buckets) if length > 0 else 0
+
+        if not per_bucket:
+            pcm = decode_pcm(path)
+            per_bucket = max(1, len(pcm) // buckets)
+            blocks = iter([pcm])
+        else:
+            blocks = iter_pcm_blocks(path)
+
+        mins = np.zeros(buckets, dtype=np.int16)
+        maxs = np.zeros(buckets, dtype=np.int16)
+        filled = 0
+        buf = np.zeros(0, dtype=np.int16)
+        for block in blocks:
+            buf = np.concatenate([buf, block]) if len(buf) else block
+            full = min(len(buf) // per_bucket, buckets - filled)
+            if full:
+                view = buf[:full * per_bucket].reshape(full, per_bucket)
+                mins[filled:filled + full] = view.min(axis=1)
+                maxs[filled:filled + full] = view.max(axis=1)
+                filled += full
+                buf = buf[full * per_bucket:]
+            if filled >= buckets:
+                break
+        if len(buf) and filled < buckets:
+            mins[filled] = buf.min()
+            maxs[filled] = buf.max()
+            filled += 1
+        if not filled:
+            return None
 
+        peaks = (np.stack([mins[:filled], maxs[:filled]], axis=1) >> 8).astype(np.int8)
+        save_waveform(path, mtime, peaks)
+        return peaks
+    except Exception:
+        return None
 
-def add_selected_to_queue(event=None) -> None:
-    idx = playlist_get_selected_index()
-    if idx is None or idx < 0 or idx >= len(song_names):
-        return
-    song_queue.append(song_names[idx])
-    refresh_queue_mini()
-    update_next_line()
-    flash_status("Added to queue.", 1200)
 
+def waveform_cache_path(path: str) -> str:
+    return os.path.join(WAVEFORM_DIR, hashlib.sha1(path.encode("utf-8")).hexdigest() + ".peaks")
 
-def pop_queue_next_index() -> int | None:
-    """Pop next queued title and return its playlist index, or None."""
-    while song_queue:
-        title = song_queue.pop(0)
-        refresh_queue_mini()
-        update_next_line()
-        try:
-            return song_names.index(title)
-        except ValueError:
-            continue
-    return None
+
+def save_waveform(path: str, mtime: float, peaks: "np.ndarray") -> None:
+    """Cache layout: little-endian float64 mtime, then interleaved int8 (min, max) pairs."""
+    try:
+        os.makedirs(WAVEFORM_DIR, exist_ok=True)
+        target = waveform_cache_path(path)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(struct.pack("<d", mtime))
+            f.write(peaks.tobytes())
+        os.replace(tmp, target)
+    except OSError:
+        pass
+
+
+def load_cached_waveform(path: str) -> "np.ndarray | None":
+    try:
+        with open(waveform_cache_path(path), "rb") as f:
+            data = f.read()
+        if len(data) < 10 or struct.unpack("<d", data[:8])[0] != os.path.getmtime(path):
+            return None
+        return np.frombuffer(data[8:], dtype=np.int8).reshape(-1, 2)
+    except (OSError, ValueError):
+        return None
+
+
+def job_read_tags(path: str) -> dict:
+    """Library job worker: the tag fields kept in LIBRARY_FILE."""
+    meta = read_track_meta(path)
+    return {"mtime": meta.mtime, "length": meta.length, "title": meta.title,
+            "artist": meta.artist, "gain_db": meta.gain_db}
+
+
+def job_loudness(path: str) -> list | None:
+    """Library job worker: [mtime, RMS level in dBFS] over the whole decoded track."""
+    mtime = os.path.getmtime(path)
+    total = 0.0
+    count = 0
+    for block in iter_pcm_blocks(path):
+        samples = block.astype(np.float64)
+        total += float(np.dot(samples, samples))
+        count += len(samples)
+    if not count or total <= 0:
+        return None
+    return [mtime, float(10 * np.log10(total / count / 32768.0 ** 2))]
+
+
+def job_art_thumb(path: str) -> str | None:
+    """Library job worker: render the album art once to the thumbnail cache."""
+    meta = read_track_meta(path)
+    img = render_album_art(meta.pictures, ART_SIZE)
+    if img is None:
+        return None
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    target = thumb_cache_path(path, meta.mtime)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    img.save(tmp, format="JPEG", quality=90)
+    os.replace(tmp, target)
+    return os.path.basename(target)
+
+
+JOB_WORKERS = {
+    "tags": job_read_tags,
+    "thumbs": job_art_thumb,
+    "loudness": job_loudness,
+    "fingerprint": job_fingerprint,
+}
+
+
+def run_job_chunk(kind: str, paths: list[str]) -> tuple[dict, int]:
+    """Worker entry point for LibraryJob: ({path: result or None}, bytes of input read)."""
+    worker = JOB_WORKERS[kind]
+    out = {}
+    nbytes = 0
+    for path in paths:
+        try:
+            nbytes += os.path.getsize(path)
+            out[path] = worker(path)
+        except Exception:
+            out[path] = None
+    return out, nbytes
+
+
+# =========================
+# Background work (process pool polled from Tk)
+# =========================
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def available_cores() -> int:
+    """Cores this process may actually run on (affinity/cgroup masks included where exposed)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 2
+
+
+def process_pool_workers() -> int:
+    return max(1, available_cores() - 1)
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=process_pool_workers(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_decode_worker,
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def submit_to_pool(fn, *args):
+    """Submit to the shared pool, rebuilding it once if a dead worker has broken it."""
+    try:
+        return get_process_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        shutdown_process_pool()
+        return get_process_pool().submit(fn, *args)
+
+
+def when_done(future, callback, poll_ms: int = 100) -> None:
+    """Run callback(future) on the Tk thread once the future has finished."""
+    def poll():
+        if future.done():
+            callback(future)
+        else:
+            window.after(poll_ms, poll)
+    poll()
+
+
+# =========================
+# Queue (single source of truth)
+# =========================
+QUEUE_MINI_ITEMS = 3
+
+
+def queue_mini_rows() -> list[str]:
+    if not song_queue:
+        return ["(queue empty)"]
+    rows = [display_title(title) for title in song_queue[:QUEUE_MINI_ITEMS]]
+    if len(song_queue) > QUEUE_MINI_ITEMS:
+        rows.append(f"... +{len(song_queue) - QUEUE_MINI_ITEMS}")
+    return rows
+
+
+def next_line_text() -> str:
+    if song_queue:
+        return f"Next: {display_title(song_queue[0])}"
+
+    if playlist_size() == 0:
+        return "No songs queued."
+
+    if play_mode != "sequential":
+        nxt = peek_mode_next()
+        return f"Next ({play_mode}): {display_title(playlist_get(nxt))}" if nxt is not None else "No songs queued."
+
+    if curr_index is None:
+        return "No songs queued."
+
+    nxt = (curr_index + 1) % playlist_size()
+    return f"Next: {display_title(playlist_get(nxt))}"
+
+
+def refresh_queue_mini() -> None:
+    """Cheap: marks the mini queue stale, the next render frame redraws what changed."""
+    global queue_dirty
+    queue_dirty = True
+    request_render()
+
+
+def update_next_line() -> None:
+    global next_line_dirty
+    next_line_dirty = True
+    request_render()
+
+
+def add_selected_to_queue(event=None) -> None:
+    idx = playlist_get_selected_index()
+    if idx is None or idx < 0 or idx >= len(song_names):
+        return
+    song_queue.append(song_names[idx])
+    refresh_queue_mini()
+    update_next_line()
+    flash_status("Added to queue.", 1200)
+
+
+def pop_queue_next_index() -> int | None:
+    """Pop next queued title and return its playlist index, or None."""
+    while song_queue:
+        title = song_queue.pop(0)
+        refresh_queue_mini()
+        update_next_line()
+        try:
+            return song_names.index(title)
+        except ValueError:
+            continue
+    return None
 
 
 def clear_queue(event=None) -> None:
@@ -479,15 +1827,481 @@ def clear_queue(event=None) -> None:
     flash_status("Queue cleared.", 1500)
 
 
+# =========================
+# Play modes (sequential / shuffle / weighted shuffle)
+# =========================
+PLAY_MODES = ("sequential", "shuffle", "weighted")
+MODE_HISTORY_MAX = 1000
+DEFAULT_RATING = 3
+MAX_RATING = 5                         # ratings run 0..MAX_RATING
+
+play_mode = "sequential"
+play_stats: dict[str, list[int]] = {}  # filepath -> [play count, rating]
+mode_history: list[int] = []           # playlist indices; [pos + 1:] are already-picked upcoming tracks
+mode_history_pos = -1
+
+
+class ShuffleOrder:
+    """Shuffle without repeats as a lazy Fisher-Yates: only displaced slots are stored,
+    so a draw is O(1) at any playlist size. Indices appended to the playlist simply join
+    the undrawn part of the current cycle."""
+
+    def __init__(self):
+        self.swaps: dict[int, int] = {}
+        self.drawn = 0
+
+    def reset(self) -> None:
+        self.swaps.clear()
+        self.drawn = 0
+
+    def draw(self, n: int) -> int | None:
+        if n <= 0:
+            return None
+        if self.drawn >= n:            # cycle finished: start a new permutation
+            self.reset()
+        j = random.randrange(self.drawn, n)
+        picked = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.pop(self.drawn, self.drawn)
+        if j == self.drawn:
+            del self.swaps[j]
+        self.drawn += 1
+        return picked
+
+
+class WeightedPicker:
+    """Vose alias table over per-track weight ceilings: O(1) samples. Each track comes with a
+    ceiling its weight can't exceed until the ceiling is next lowered (ratings top out, plays
+    only lower it), so every weight change is applied in place by rejection (accept with
+    weight / ceiling the table was built with). Tracks added later are drawn from a tail with
+    one shared ceiling. The O(n) rebuild only runs once the tail outgrows the table or the
+    weights have halved since the build, so it is amortised O(1) per change."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.weights: list[float] = []
+        self.ceilings: list[float] = []
+        self.built: list[float] = []       # ceilings the table was built over
+        self.prob: list[float] = []
+        self.alias: list[int] = []
+        self.total = 0.0
+        self.built_total = 0.0             # sum of `built`
+        self.total_at_build = 0.0
+        self.tail_cap = 0.0                # ceiling shared by the tracks after len(built)
+        self.dirty = True
+
+    def set_weight(self, i: int, w: float, ceiling: float) -> None:
+        if i >= len(self.weights):
+            return
+        self.total += w - self.weights[i]
+        self.weights[i] = w
+        self.ceilings[i] = ceiling
+        if i >= len(self.built):
+            self.tail_cap = max(self.tail_cap, w)
+        elif w > self.built[i] or self.total < 0.5 * self.total_at_build:
+            self.dirty = True
+
+    def extend(self, pairs) -> None:
+        """Append (weight, ceiling) pairs."""
+        for w, ceiling in pairs:
+            self.weights.append(w)
+            self.ceilings.append(ceiling)
+            self.total += w
+            self.tail_cap = max(self.tail_cap, ceiling)
+        if len(self.weights) - len(self.built) > len(self.built):
+            self.dirty = True
+
+    def _rebuild(self) -> None:
+        n = len(self.weights)
+        self.built = list(self.ceilings)
+        self.built_total = sum(self.built)
+        self.total_at_build = self.total
+        self.tail_cap = 0.0
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        self.dirty = False
+        if not n or self.built_total <= 0:
+            return
+        scaled = [w * n / self.built_total for w in self.built]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s_i, l_i = small.pop(), large.pop()
+            self.prob[s_i] = scaled[s_i]
+            self.alias[s_i] = l_i
+            scaled[l_i] -= 1.0 - scaled[s_i]
+            (small if scaled[l_i] < 1.0 else large).append(l_i)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self) -> int | None:
+        if self.dirty:
+            self._rebuild()
+        n = len(self.built)
+        tail = len(self.weights) - n
+        mass = self.built_total + tail * self.tail_cap
+        if self.total <= 0 or mass <= 0:
+            return None
+        while True:
+            if random.random() * mass < self.built_total:
+                i = random.randrange(n)
+                j = i if random.random() < self.prob[i] else self.alias[i]
+                cap = self.built[j]
+            else:
+                j = n + random.randrange(tail)
+                cap = self.tail_cap
+            if cap > 0 and random.random() * cap <= self.weights[j]:
+                return j
+
+
+shuffle_order = ShuffleOrder()
+weighted_picker = WeightedPicker()
+
+
+def load_play_stats() -> None:
+    global play_stats
+    play_stats = load_json_cache(STATS_FILE)
+
+
+def save_play_stats() -> None:
+    save_json_cache(STATS_FILE, play_stats)
+
+
+def play_weight(plays: int, rating: int) -> tuple[float, float]:
+    """(weight, ceiling): rarely played and highly rated tracks come up more often. The ceiling
+    is the weight at MAX_RATING, which only a play (lowering it) changes."""
+    return (1 + rating) / (1 + plays), (1 + MAX_RATING) / (1 + plays)
+
+
+def track_weight(title: str) -> tuple[float, float]:
+    return play_weight(*play_stats.get(song_map.get(title, ""), (0, DEFAULT_RATING)))
+
+
+def reset_play_modes() -> None:
+    """Called when the playlist is replaced wholesale."""
+    global mode_history_pos
+    shuffle_order.reset()
+    weighted_picker.reset()
+    mode_history.clear()
+    mode_history_pos = -1
+
+
+def draw_mode_index() -> int | None:
+    n = playlist_size()
+    if play_mode == "shuffle":
+        return shuffle_order.draw(n)
+
+    have = len(weighted_picker.weights)
+    if have > n:
+        weighted_picker.reset()
+        have = 0
+    if have < n:
+        weighted_picker.extend(track_weight(song_names[i]) for i in range(have, n))
+    return weighted_picker.sample()
+
+
+def peek_mode_next() -> int | None:
+    """Upcoming shuffle pick (drawn once, then remembered so Next shows what will play)."""
+    n = playlist_size()
+    while mode_history_pos + 1 < len(mode_history):
+        idx = mode_history[mode_history_pos + 1]
+        if idx < n:
+            return idx
+        del mode_history[mode_history_pos + 1]     # playlist shrank under us
+
+    idx = draw_mode_index()
+    if idx is not None:
+        mode_history.append(idx)
+    return idx
+
+
+def advance_mode() -> int | None:
+    global mode_history_pos
+    idx = peek_mode_next()
+    if idx is None:
+        return None
+    mode_history_pos += 1
+    if mode_history_pos > MODE_HISTORY_MAX:
+        drop = mode_history_pos - MODE_HISTORY_MAX
+        del mode_history[:drop]
+        mode_history_pos -= drop
+    return idx
+
+
+def retreat_mode() -> int | None:
+    global mode_history_pos
+    while mode_history_pos > 0:
+        mode_history_pos -= 1
+        idx = mode_history[mode_history_pos]
+        if idx < playlist_size():
+            return idx
+    return None
+
+
+def note_mode_play(idx: int) -> None:
+    """A track chosen by hand joins the history so Prev/Next walk around it."""
+    global mode_history_pos
+    if 0 <= mode_history_pos < len(mode_history) and mode_history[mode_history_pos] == idx:
+        return
+    mode_history.insert(mode_history_pos + 1, idx)
+    mode_history_pos += 1
+
+
+def record_play(idx: int, path: str) -> None:
+    stats = play_stats.setdefault(path, [0, DEFAULT_RATING])
+    stats[0] += 1
+    weighted_picker.set_weight(idx, *play_weight(*stats))
+
+
+def cycle_play_mode(event=None) -> None:
+    global play_mode
+    play_mode = PLAY_MODES[(PLAY_MODES.index(play_mode) + 1) % len(PLAY_MODES)]
+    if play_mode != "sequential" and curr_index is not None:
+        note_mode_play(curr_index)
+    update_next_line()
+    flash_status(f"Mode: {play_mode}", 1500)
+
+
+def rate_current(delta: int) -> None:
+    if current_song_title is None:
+        return
+    path = song_map.get(current_song_title)
+    if not path:
+        return
+    stats = play_stats.setdefault(path, [0, DEFAULT_RATING])
+    stats[1] = max(0, min(stats[1] + delta, MAX_RATING))
+    idx = current_song_index
+    # the playlist may have been replaced under the playing track
+    if idx is not None and idx < len(song_names) and song_names[idx] == current_song_title:
+        weighted_picker.set_weight(idx, *play_weight(*stats))
+    flash_status(f"Rating: {'★' * stats[1]}{'☆' * (MAX_RATING - stats[1])}", 1500)
+
+
+# =========================
+# Playlist files (M3U / M3U8 / PLS)
+# =========================
+PLAYLIST_BATCH = 500
+PLAYLIST_FILETYPES = [("Playlists", "*.m3u *.m3u8 *.pls"), ("All files", "*.*")]
+playlist_import_gen = 0                # bumped to cancel an import that is still filling
+
+
+def iter_playlist_entries(path: str):
+    """Yield (location, title or None, seconds or None) while reading the file line by line."""
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        if path.lower().endswith(".pls"):
+            cur_n, entry = None, {}
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if not sep:
+                    continue
+                field = key.rstrip("0123456789").lower()
+                n = key[len(field):]
+                if field not in ("file", "title", "length") or not n:
+                    continue
+                if n != cur_n:
+                    if entry.get("file"):
+                        yield entry["file"], entry.get("title"), entry.get("length")
+                    cur_n, entry = n, {}
+                if field == "length":
+                    try:
+                        entry["length"] = float(value) if float(value) >= 0 else None
+                    except ValueError:
+                        pass
+                else:
+                    entry[field] = value.strip()
+            if entry.get("file"):
+                yield entry["file"], entry.get("title"), entry.get("length")
+            return
+
+        title, length = None, None
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#EXTINF:"):
+                info, _, t = line[8:].partition(",")
+                try:
+                    length = float(info.split()[0]) if info.split() else None
+                    if length is not None and length < 0:
+                        length = None
+                except ValueError:
+                    length = None
+                title = t.strip() or None
+                continue
+            if line.startswith("#"):
+                continue
+            yield line, title, length
+            title, length = None, None
+
+
+def iter_resolved_batches(entries, base_dir: str, library: Mapping[str, str], batch: int = PLAYLIST_BATCH):
+    """Turn raw entries into lists of (title, path, seconds), batch by batch. Entries are matched
+    against `library` (full path, then a file name only one library track has); anything else
+    is taken on trust and only checked when it is played."""
+    # (title, path) pairs, so `library` isn't read again once the first batch is out: a snapshot
+    # swap part-way through an import must not matter
+    by_path = {os.path.normcase(os.path.abspath(p)): (t, p) for t, p in library.items()}
+    by_name = {}
+    for t, p in by_path.values():
+        name = os.path.normcase(os.path.basename(p))
+        by_name[name] = None if name in by_name else (t, p)    # "01 Intro.mp3" in two albums: no guess
+    out = []
+    for location, title, length in entries:
+        if "://" in location:
+            url = urlparse(location)
+            if url.scheme != "file":
+                continue                   # streams aren't playable here
+            location = unquote(url.path)
+        location = os.path.expanduser(location.replace("\\", os.sep) if os.sep == "/" else location)
+        full = os.path.normpath(location if os.path.isabs(location) else os.path.join(base_dir, location))
+
+        key = os.path.normcase(full)
+        known = by_path.get(key) or by_name.get(os.path.normcase(os.path.basename(full)))
+        if known is not None:
+            out.append((*known, length))
+        else:
+            stem = os.path.splitext(os.path.basename(full))[0]
+            out.append((title or stem, full, length))
+
+        if len(out) >= batch:
+            yield out
+            out = []
+    if out:
+        yield out
+
+
+def unique_title(title: str, path: str) -> str:
+    if song_map.get(title, path) == path:
+        return title
+    n = 2
+    while song_map.get(f"{title} ({n})", path) != path:
+        n += 1
+    return f"{title} ({n})"
+
+
+def cancel_playlist_import() -> None:
+    global playlist_import_gen
+    playlist_import_gen += 1
+
+
+def import_playlist(path: str) -> None:
+    """Replace the playlist with the file's entries, one batch per Tk tick."""
+    global song_names, song_map, curr_index
+
+    if not os.path.isfile(path):
+        flash_status("Could not open playlist.", 2500)
+        return
+
+    cancel_playlist_import()
+    gen = playlist_import_gen
+    batches = iter_resolved_batches(iter_playlist_entries(path), os.path.dirname(os.path.abspath(path)), library_map)
+
+    song_names = []
+    song_map = {}                          # only the imported entries; library_map keeps the folder
+    curr_index = None
+    reset_play_modes()
+    playlist_sync_rows()
+
+    def step():
+        global curr_index
+        if gen != playlist_import_gen:
+            return
+        try:
+            batch = next(batches)
+        except StopIteration:
+            flash_status(f"Imported {len(song_names)} songs.", 2000)
+            return
+        except (OSError, UnicodeError):
+            flash_status("Playlist read failed part-way.", 2500)
+            return
+
+        rows = []
+        for title, track_path, length in batch:
+            title = unique_title(title, track_path)
+            # EXTINF/PLS lengths are whole seconds: too coarse to stand in for TrackMeta.length,
+            # which drives end-of-track detection, so the real length is probed on play.
+            song_map[title] = track_path
+            rows.append(title)
+        song_names.extend(rows)
+        playlist_append_rows(rows)
+        if curr_index is None and song_names:
+            curr_index = 0
+        update_next_line()
+        set_status(f"Importing... {len(song_names)}")
+        window.after(1, step)
+
+    step()
+
+
+def iter_playlist_lines(fmt: str, base_dir: str):
+    def location(track_path):
+        try:
+            return os.path.relpath(track_path, base_dir)
+        except ValueError:                 # different drive on Windows
+            return track_path
+
+    if fmt == "pls":
+        yield "[playlist]\n"
+    else:
+        yield "#EXTM3U\n"
+
+    n = 0
+    for title in song_names:
+        track_path = song_map.get(title)
+        if not track_path:
+            continue
+        n += 1
+        secs = int(round(known_length(track_path)))
+        if fmt == "pls":
+            yield f"File{n}={location(track_path)}\nTitle{n}={title}\nLength{n}={secs}\n"
+        else:
+            yield f"#EXTINF:{secs},{title}\n{location(track_path)}\n"
+
+    if fmt == "pls":
+        yield f"NumberOfEntries={n}\nVersion=2\n"
+
+
+def export_playlist(path: str) -> bool:
+    fmt = "pls" if path.lower().endswith(".pls") else "m3u"
+    try:
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            for chunk in iter_playlist_lines(fmt, os.path.dirname(os.path.abspath(path))):
+                f.write(chunk)
+        return True
+    except OSError:
+        return False
+
+
+def import_playlist_button(event=None) -> None:
+    path = filedialog.askopenfilename(filetypes=PLAYLIST_FILETYPES)
+    if path:
+        import_playlist(path)
+
+
+def export_playlist_button(event=None) -> None:
+    if not song_names:
+        flash_status("Playlist is empty.", 2000)
+        return
+    path = filedialog.asksaveasfilename(defaultextension=".m3u8", filetypes=PLAYLIST_FILETYPES)
+    if not path:
+        return
+    if export_playlist(path):
+        flash_status(f"Exported {len(song_names)} songs.", 2000)
+    else:
+        flash_status("Could not write playlist.", 2500)
+
+
 # =========================
 # Playback control (QUEUE FIX + SELECTION SNAP BACK)
 # =========================
+@profiled("play_song")
 def play_song(idx: int | None = None, update_cursor: bool = True) -> None:
     """
     - update_cursor=True  -> normal playlist behavior (moves curr_index)
     - update_cursor=False -> queue behavior (DOES NOT move curr_index)
     """
-    global curr_index, current_song_title, is_playing, play_start_offset
+    global curr_index, current_song_title, current_song_index, current_song_name, is_playing, play_start_offset
     global playing_from_queue, restore_selection_index
 
     if playlist_size() == 0:
@@ -501,6 +2315,7 @@ def play_song(idx: int | None = None, update_cursor: bool = True) -> None:
         pass
     is_playing = False
     play_start_offset = 0.0
+    playback_clock.stop()
     progress_bar.set(0)
 
     if idx is None:
@@ -522,9 +2337,13 @@ def play_song(idx: int | None = None, update_cursor: bool = True) -> None:
     # Only update the playlist cursor if this is a "real" playlist play
     if update_cursor:
         curr_index = idx
+        if play_mode != "sequential":
+            note_mode_play(idx)
 
     song_title = playlist_get(idx)
     current_song_title = song_title
+    current_song_index = idx
+    current_song_name = None
 
     set_status(f"▶ {display_title(song_title)}")
     update_next_line()
@@ -534,7 +2353,18 @@ def play_song(idx: int | None = None, update_cursor: bool = True) -> None:
         flash_status("Song path missing.", 2500)
         return
 
-    play_music(path)
+    if not play_music(path):
+        # not a play: no stats, waveform, lyrics or art, and the status doesn't fall back to "▶ title"
+        current_song_title = current_song_index = None
+        return
+    record_play(idx, path)
+
+    meta = get_track_meta(path)
+    if meta.title:
+        current_song_name = meta.title
+        set_status(f"▶ {meta.title}")
+    show_lyrics(meta)
+    show_waveform(path)
     equalizer_gif.start()
 
     art = load_album_art(path, size=ART_SIZE)
@@ -550,7 +2380,8 @@ def next_song(event=None) -> None:
     """
     Priority:
       1) queue
-      2) playlist cursor (curr_index) + 1
+      2) shuffle / weighted pick (if that mode is on)
+      3) playlist cursor (curr_index) + 1
     """
     global curr_index
 
@@ -563,6 +2394,12 @@ def next_song(event=None) -> None:
         play_song(q_idx, update_cursor=False)
         return
 
+    if play_mode != "sequential":
+        m_idx = advance_mode()
+        if m_idx is not None:
+            play_song(m_idx, update_cursor=True)
+            return
+
     if curr_index is None:
         play_song(0, update_cursor=True)
         return
@@ -579,6 +2416,12 @@ def prev_song(event=None) -> None:
     if playlist_size() == 0:
         return
 
+    if play_mode != "sequential":
+        m_idx = retreat_mode()
+        if m_idx is not None:
+            play_song(m_idx, update_cursor=True)
+            return
+
     if curr_index is None:
         play_song(0, update_cursor=True)
         return
@@ -603,6 +2446,7 @@ def pause_song() -> None:
     except Exception:
         return
     is_playing = False
+    playback_clock.pause()
     flash_status("Music paused.", 1500)
     equalizer_gif.stop("pause")   # freeze-frame for pause
 
@@ -614,12 +2458,13 @@ def resume_song() -> None:
     except Exception:
         return
     is_playing = True
+    playback_clock.resume()
     flash_status("Music resumed.", 1500)
     equalizer_gif.start()
 
 
 def stop_song() -> None:
-    global is_playing, current_song_title
+    global is_playing, current_song_title, current_song_index, current_song_name
     global playing_from_queue, restore_selection_index
 
     try:
@@ -628,9 +2473,13 @@ def stop_song() -> None:
         pass
 
     is_playing = False
+    playback_clock.stop()
     progress_bar.set(0)
     current_song_title = None
+    current_song_index = None
+    current_song_name = None
     set_default_status()
+    show_lyrics(None)
 
     playing_from_queue = False
     restore_selection_index = None
@@ -646,25 +2495,41 @@ def toggle_play_pause(event=None) -> None:
         resume_song()
 
 
-def skip_seconds(delta: float) -> None:
+def seek_to(seconds: float) -> None:
     global play_start_offset
 
     if current_song_length <= 0:
         return
 
-    pos_ms = pygame.mixer.music.get_pos()
-    pos_sec = max(0.0, pos_ms / 1000.0) if pos_ms >= 0 else 0.0
-    current_abs = play_start_offset + pos_sec
-
-    new_pos = max(0.0, min(current_abs + delta, current_song_length - 0.1))
+    new_pos = max(0.0, min(seconds, current_song_length - 0.1))
     play_start_offset = new_pos
 
     pygame.mixer.music.play(start=new_pos)
+    reset_mixer_stall()
     if not is_playing:
         pygame.mixer.music.pause()
+    playback_clock.seek(new_pos)
+    progress_bar.set(new_pos / current_song_length)
+    update_lyrics(new_pos)
+
+
+def seek_fraction(fraction: float) -> None:
+    seek_to(fraction * current_song_length)
+
+
+def skip_seconds(delta: float) -> None:
+    if current_song_length <= 0:
+        return
+    seek_to(playback_clock.position() + delta)
 
 
 current_volume = 0.5
+current_gain_db = 0.0                  # ReplayGain of the loaded track
+
+
+def effective_volume() -> float:
+    """Slider volume with the track's ReplayGain applied (capped at full scale)."""
+    return max(0.0, min(current_volume * 10 ** (current_gain_db / 20.0), 1.0))
 
 
 def set_volume(val) -> None:
@@ -673,7 +2538,7 @@ def set_volume(val) -> None:
     try:
         current_volume = float(val) / 10.0
         current_volume = max(0.0, min(current_volume, 1.0))
-        pygame.mixer.music.set_volume(current_volume)
+        pygame.mixer.music.set_volume(effective_volume())
     except Exception:
         pass
 
@@ -681,286 +2546,1534 @@ def set_volume(val) -> None:
 # =========================
 # Progress (QUEUE SNAP-BACK happens here)
 # =========================
+@profiled("update_progress")
 def update_progress() -> None:
     global is_playing
     global playing_from_queue, restore_selection_index
 
-    if is_playing and current_song_length > 0:
+    if profiling_enabled:
+        check_mixer_stall(pygame.mixer.music.get_pos() if is_playing else -1)
+
+    if is_playing and current_song_length > 0 and playback_clock.loaded:
         pos_ms = pygame.mixer.music.get_pos()
         if pos_ms >= 0:
-            pos_sec = play_start_offset + (pos_ms / 1000.0)
-            fraction = min(pos_sec / current_song_length, 1.0)
-            progress_bar.set(fraction)
-
-            # End detection
-            if pos_sec >= current_song_length - 0.2:
-                is_playing = False
-
-                # ✅ If the track that ended was from queue, restore selection first
-                if playing_from_queue:
-                    playing_from_queue = False
-                    if restore_selection_index is not None and 0 <= restore_selection_index < playlist_size():
-                        playlist_select_index(restore_selection_index)
-                    restore_selection_index = None
-
-                next_song()
-        else:
-            progress_bar.set(0)
+            playback_clock.correct(play_start_offset + pos_ms / 1000.0)
+        # get_pos() is -1 once the stream has run dry; the clock keeps going so the end is still seen
+        pos_sec = playback_clock.position()
+        fraction = min(pos_sec / current_song_length, 1.0)
+        progress_bar.set(fraction)
+        update_lyrics(pos_sec)
+
+        # End detection
+        if pos_sec >= current_song_length - 0.2:
+            is_playing = False
+
+            # ✅ If the track that ended was from queue, restore selection first
+            if playing_from_queue:
+                playing_from_queue = False
+                if restore_selection_index is not None and 0 <= restore_selection_index < playlist_size():
+                    playlist_select_index(restore_selection_index)
+                restore_selection_index = None
+
+            next_song()
 
     window.after(200, update_progress)
 
 
 # =========================
-# UI Build (same layout architecture)
+# Zones (extra rooms fed from this process)
 # =========================
-window = CTk()
-window.geometry("850x720")
-window.title("Music Player")
-window.configure(fg_color="black")
+ZONE_CHUNK = 1024                      # sample frames per device callback
+ZONE_POLL_MS = 250
 
-icon = PhotoImage(file=os.path.join(APP_DIR, "icons/music_note_icon.png"))
-window.iconphoto(True, icon)
+zones: list["Zone"] = []
+zone_buffers = memory_budget.cache("zones")   # decoded tracks the zones are playing (charged, not evictable)
 
-label = CTkLabel(
-    window,
-    text="MUSIC PLAYER",
-    font=("Monospace", 45, "bold"),
-    text_color="#00FFAA",
-)
-label.pack(pady=(10, 2))
-
-playlist_outer = CTkFrame(
-    window,
-    fg_color="black",
-    border_color="#00FFAA",
-    border_width=3,
-    corner_radius=0
-)
-playlist_outer.grid_columnconfigure(0, weight=1)
-playlist_outer.grid_rowconfigure(0, weight=1)
-playlist_outer.pack(padx=20, pady=(5, 10), fill="x")
-
-playlist_inner = CTkFrame(
-    playlist_outer,
-    fg_color="black",
-    border_color="#222222",
-    border_width=4,
-    corner_radius=0
-)
-playlist_inner.columnconfigure(0, weight=3)
-playlist_inner.columnconfigure(1, weight=2)
-playlist_inner.rowconfigure(0, weight=1)
-playlist_inner.grid(column=0, row=0, padx=4, pady=4, sticky="nsew")
-
-playlist_left = CTkFrame(playlist_inner, fg_color="black", corner_radius=0)
-playlist_left.grid(row=0, column=0, sticky="nsew", padx=(4, 2), pady=4)
-
-playlist_label = CTkLabel(
-    playlist_left,
-    text="Playlist",
-    font=("Helvetica", 20, "bold"),
-    text_color="#00FFAA",
-    fg_color="black",
-    anchor="n",
-)
-playlist_label.pack(anchor="n", pady=(6, 2))
-
-playlist = CTkListbox(
-    playlist_left,
-    width=400,
-    height=220,
-    font=("Helvetica", 18),
-    fg_color="black",
-    text_color="#00FFAA",
-    border_width=0,
-    highlight_color="#003300",
-    hover_color="#004400",
-)
-playlist.pack(padx=2, pady=(2, 4), fill="x")
-
-load_music_btn = CTkButton(playlist_left, text="Load Music", command=load_music_button)
-load_music_btn.configure(
-    font=("Helvetica", 16, "bold"),
-    text_color="black",
-    fg_color="#00FFAA",
-    corner_radius=0,
-    anchor="s",
-)
-load_music_btn.pack(anchor="s", padx=6, pady=(2, 6))
-
-playlist_right = CTkFrame(
-    playlist_inner,
-    fg_color="black",
-    border_color="#00FFAA",
-    border_width=2,
-    corner_radius=0
-)
-playlist_right.grid(row=0, column=1, sticky="nsew", padx=(2, 4), pady=4)
-playlist_right.configure(width=260)
-playlist_right.grid_propagate(False)
-
-album_art_label = CTkLabel(playlist_right, text="")
-album_art_label.pack(pady=(12, 8))
-
-placeholder_gif = GifPlayer(window, album_art_label, os.path.join(APP_DIR, "gifs/placeholder.gif"), ART_SIZE)
-start_placeholder_gif()
-
-progress_bar = CTkProgressBar(
-    window,
-    width=500,
-    height=10,
-    fg_color="black",
-    progress_color="#00FF00",
-    border_width=1,
-    border_color="#00FF00",
-)
-progress_bar.set(0)
-progress_bar.pack(pady=(2, 10))
-
-frame = CTkFrame(window, fg_color="black")
-frame.pack(pady=10)
-frame.grid_rowconfigure(0, weight=1)
-frame.grid_rowconfigure(1, weight=1)
-frame.grid_columnconfigure(0, weight=1)
-
-frame_top = CTkFrame(frame, fg_color="black")
-frame_top.grid(row=0, column=0, sticky="nsew", pady=(0, 5))
-
-frame_middle = CTkFrame(frame, fg_color="black")
-frame_middle.grid(row=1, column=0, sticky="nsew", pady=(0, 5))
-
-for row_frame in (frame_top, frame_middle):
-    row_frame.grid_columnconfigure(0, weight=1)
-    row_frame.grid_columnconfigure(1, weight=1)
-    row_frame.grid_columnconfigure(2, weight=1)
-
-photo_Button_style = {
-    "width": 50,
-    "height": 50,
-    "fg_color": "black",
-    "hover_color": "#003300",
-    "border_color": "#00FF00",
-    "border_width": 1,
-    "corner_radius": 0,
+
+class Zone:
+    """One extra room: its own queue, cursor, volume and output device.
+
+    Everything it knows about the library comes from the shared, read-only layer
+    (song_map / song_names, track metadata, art); all a zone owns is the decoded PCM of
+    its current track, charged to the memory budget, and an SDL audio device fed from it.
+    pygame's only streaming decoder is mixer.music, which the main room owns, so the
+    track is decoded whole; the PCM is read straight out of the Sound without a copy.
+    """
+
+    def __init__(self, name: str, device_name: str):
+        self.name = name
+        self.device_name = device_name
+        self.device = None
+        self.queue: list[str] = []     # queued titles
+        self.cursor: int | None = None # index into song_names
+        self.title: str | None = None
+        self.volume = 0.5
+        self.paused = False
+
+        self.sound = None              # pygame Sound backing pcm
+        self.pcm = b""                 # byte view of the decoded track, in the main mixer's format
+        self.pos = 0                   # byte offset into pcm (advanced by the audio thread)
+        self.gain = 1.0                # ReplayGain / analysed loudness of the track, as a factor
+        self.finished = False
+        self.load_gen = 0
+        self.loaded = None             # (generation, Sound or None) from the decode thread
+
+        self.window: CTkToplevel | None = None
+        self.now_label: CTkLabel | None = None
+        self.queue_label: CTkLabel | None = None
+
+    # ---- audio thread ----
+    def _fill(self, device, stream) -> None:
+        n = len(stream)
+        if self.paused or not self.pcm:
+            stream[:] = bytes(n)
+            return
+        chunk = bytes(self.pcm[self.pos:self.pos + n])
+        self.pos += len(chunk)
+        level = min(self.volume * self.gain, 1.0)        # same clamp as effective_volume()
+        if level < 0.999 and chunk:
+            if np is not None:
+                chunk = (np.frombuffer(chunk, dtype=np.int16) * level).astype(np.int16).tobytes()
+            else:
+                samples = array("h", chunk)
+                chunk = array("h", [int(v * level) for v in samples]).tobytes()
+        if len(chunk) < n:
+            chunk += bytes(n - len(chunk))
+            self.finished = True
+        stream[:] = chunk
+
+    # ---- main thread ----
+    def _set_pcm(self, sound) -> None:
+        zone_buffers.charge(-len(self.pcm))
+        self.sound = sound
+        self.pcm = memoryview(sound).cast("B") if sound is not None else b""
+        zone_buffers.charge(len(self.pcm))
+
+    def _open_device(self, device_name: str):
+        freq, _, channels = pygame.mixer.get_init()
+        device = sdl2_audio.AudioDevice(
+            devicename=device_name, iscapture=False, frequency=freq,
+            audioformat=sdl2_audio.AUDIO_S16, numchannels=channels,
+            chunksize=ZONE_CHUNK, allowed_changes=0, callback=self._fill,
+        )
+        device.pause(0)
+        return device
+
+    def open(self) -> bool:
+        if pygame.mixer.get_init()[1] != -16:
+            return False               # decoded PCM is handed over untouched, so match the mixer
+        self.device = self._open_device(self.device_name)
+        window.after(ZONE_POLL_MS, self.tick)
+        return True
+
+    def switch_device(self, device_name: str) -> None:
+        if device_name == self.device_name:
+            return
+        try:
+            device = self._open_device(device_name)
+        except Exception as e:
+            flash_status(f"Device failed: {e}", 3000)
+            return
+        old, self.device, self.device_name = self.device, device, device_name
+        if old is not None:
+            old.pause(1)
+            old.close()
+
+    def close(self) -> None:
+        self.load_gen += 1
+        if self.device is not None:
+            self.device.pause(1)
+            self.device.close()
+            self.device = None
+        self._set_pcm(None)
+        if self.window is not None:
+            try:
+                self.window.destroy()
+            except Exception:
+                pass                   # already gone with the main window
+            self.window = None
+        if self in zones:
+            zones.remove(self)
+
+    def play_index(self, idx: int) -> None:
+        if not (0 <= idx < len(song_names)):
+            return
+        path = song_map.get(song_names[idx])
+        if not path:
+            return
+        self.cursor = idx
+        self.title = song_names[idx]
+        self._set_pcm(None)
+        meta = get_track_meta(path)
+        gain_db = meta.gain_db if meta.gain_db is not None else analysed_gain_db(path, meta.mtime)
+        self.gain = 10 ** (gain_db / 20.0)
+        self.pos = 0
+        self.finished = False
+        self.paused = False
+        self.load_gen += 1
+        gen = self.load_gen
+
+        def decode():
+            try:
+                sound = pygame.mixer.Sound(path)
+            except pygame.error:
+                sound = None
+            self.loaded = (gen, sound)
+
+        threading.Thread(target=decode, daemon=True).start()
+        self.refresh()
+
+    def next(self) -> None:
+        while self.queue:
+            title = self.queue.pop(0)
+            if title in song_map:
+                try:
+                    self.play_index(song_names.index(title))
+                    return
+                except ValueError:
+                    continue
+        if not song_names:
+            return
+        nxt = 0 if self.cursor is None else (self.cursor + 1) % len(song_names)
+        self.play_index(nxt)
+
+    def prev(self) -> None:
+        if song_names:
+            self.play_index(0 if self.cursor is None else (self.cursor - 1) % len(song_names))
+
+    def toggle_pause(self) -> None:
+        if self.pcm:
+            self.paused = not self.paused
+        elif self.cursor is None and song_names:
+            self.play_index(0)
+        self.refresh()
+
+    def stop(self) -> None:
+        self.load_gen += 1
+        self._set_pcm(None)
+        self.pos = 0
+        self.title = None
+        self.refresh()
+
+    def set_volume(self, val) -> None:
+        self.volume = max(0.0, min(float(val) / 10.0, 1.0))
+
+    def tick(self) -> None:
+        if self.device is None:
+            return
+        loaded = self.loaded
+        if loaded is not None:
+            self.loaded = None
+            gen, sound = loaded
+            if gen == self.load_gen:
+                if sound is None:
+                    self.next()        # undecodable: skip it
+                else:
+                    self.pos = 0
+                    self.finished = False
+                    self._set_pcm(sound)
+        if self.finished and self.pcm:
+            self.next()
+        window.after(ZONE_POLL_MS, self.tick)
+
+    def refresh(self) -> None:
+        if self.now_label is None or self.queue_label is None:
+            return
+        if self.title is None:
+            now = "Stopped"
+        else:
+            meta = track_meta.get(song_map.get(self.title, ""))
+            name = meta.title if meta is not None and meta.title else display_title(self.title)
+            now = f"{'⏸' if self.paused else '▶'} {name}"
+        self.now_label.configure(text=now)
+        self.queue_label.configure(text=f"Queue: {len(self.queue)}")
+
+
+def zone_device_names() -> list[str]:
+    try:
+        return list(sdl2_audio.get_audio_device_names(False))
+    except Exception:
+        return []
+
+
+def add_zone(event=None) -> None:
+    if sdl2_audio is None:
+        flash_status("Zones need pygame 2 (SDL2 audio).", 2500)
+        return
+    if not ensure_audio():
+        return
+
+    devices = zone_device_names()
+    if not devices:
+        flash_status("No audio output devices found.", 2500)
+        return
+    zone = Zone(f"Zone {len(zones) + 2}", devices[0])
+    try:
+        ok = zone.open()
+    except Exception as e:
+        flash_status(f"Zone failed: {e}", 3000)
+        return
+    if not ok:
+        flash_status("Zones need a 16-bit mixer.", 2500)
+        return
+    zones.append(zone)
+    build_zone_window(zone, devices)
+
+
+def build_zone_window(zone: Zone, devices: list[str]) -> None:
+    top = CTkToplevel(window)
+    top.title(zone.name)
+    top.geometry("360x220")
+    top.configure(fg_color="black")
+    top.protocol("WM_DELETE_WINDOW", zone.close)
+    zone.window = top
+
+    CTkOptionMenu(
+        top, values=devices, command=zone.switch_device,
+        fg_color="#003300", button_color="#004400", text_color="#00FF00",
+    ).pack(fill="x", padx=6, pady=(6, 2))
+
+    zone.now_label = CTkLabel(top, text="Stopped", font=("Consolas", 14), text_color="#00FF00", fg_color="black")
+    zone.now_label.pack(pady=2)
+    zone.queue_label = CTkLabel(top, text="Queue: 0", font=("Consolas", 12), text_color="#00AA55", fg_color="black")
+    zone.queue_label.pack()
+
+    def play_selection():
+        idx = playlist_get_selected_index()
+        if idx is not None:
+            zone.play_index(idx)
+
+    def queue_selection():
+        idx = playlist_get_selected_index()
+        if idx is not None and 0 <= idx < len(song_names):
+            zone.queue.append(song_names[idx])
+            zone.refresh()
+
+    row = CTkFrame(top, fg_color="black")
+    row.pack(pady=4)
+    button_style = {"width": 44, "fg_color": "black", "hover_color": "#003300", "border_color": "#00FF00",
+                    "border_width": 1, "corner_radius": 0, "text_color": "#00FF00"}
+    for text, cmd in (("⏮", zone.prev), ("⏯", zone.toggle_pause), ("⏭", zone.next), ("■", zone.stop)):
+        CTkButton(row, text=text, command=cmd, **button_style).pack(side="left", padx=2)
+
+    row2 = CTkFrame(top, fg_color="black")
+    row2.pack(pady=2)
+    CTkButton(row2, text="Play selected", command=play_selection, **{**button_style, "width": 110}).pack(side="left", padx=2)
+    CTkButton(row2, text="Queue selected", command=queue_selection, **{**button_style, "width": 110}).pack(side="left", padx=2)
+
+    vol = CTkSlider(top, from_=0, to=10, width=200, height=10, progress_color="#00FF00",
+                    button_color="#003300", command=zone.set_volume)
+    vol.set(zone.volume * 10)
+    vol.pack(pady=6)
+
+
+def close_all_zones() -> None:
+    for zone in list(zones):
+        zone.close()
+
+
+# =========================
+# Lyrics pane
+# =========================
+lyric_times: list[float] = []          # of the playing track (shared with its TrackMeta)
+lyric_lines: list[str] = []
+lyric_index = -2                       # line on screen; -1 = before the first line, -2 = redraw
+
+
+def show_lyrics(meta: TrackMeta | None) -> None:
+    global lyric_times, lyric_lines, lyric_index
+    lyric_times = meta.lyric_times if meta is not None else []
+    lyric_lines = meta.lyric_lines if meta is not None else []
+    lyric_index = -2
+    update_lyrics(0.0)
+
+
+@profiled("update_lyrics")
+def update_lyrics(pos_sec: float) -> None:
+    """Bisect for the active line; only stage label text when it changes."""
+    global lyric_index
+    if not lyric_times:
+        if lyric_index == -2:          # just switched to a track without lyrics: blank once
+            lyric_index = -1
+            staged_labels[lyrics_label] = ""
+            staged_labels[lyrics_next_label] = ""
+            request_render()
+        return
+
+    idx = bisect_right(lyric_times, pos_sec) - 1
+    if idx == lyric_index:
+        return
+    lyric_index = idx
+    staged_labels[lyrics_label] = lyric_lines[idx] if idx >= 0 else "♪"
+    staged_labels[lyrics_next_label] = lyric_lines[idx + 1] if idx + 1 < len(lyric_lines) else ""
+    request_render()
+
+
+# =========================
+# Profiling hooks (event-loop lag, mixer stalls, overlay)
+# =========================
+LOOP_PROBE_MS = 100
+loop_probe_due = 0.0
+last_mixer_pos = (-1, 0.0)             # (get_pos ms, perf_counter) at previous tick
+MIXER_STALL_BACKSTEP_MS = 20
+profile_window: CTkToplevel | None = None
+profile_text: CTkTextbox | None = None
+
+
+def probe_loop_lag() -> None:
+    """Re-arms itself while profiling is on; lag = how late Tk ran us."""
+    global loop_probe_due
+    if not profiling_enabled:
+        loop_probe_due = 0.0
+        return
+    now = time.perf_counter()
+    if loop_probe_due:
+        profile_record("tk.loop_lag", max(0.0, (now - loop_probe_due) * 1000.0))
+    loop_probe_due = now + LOOP_PROBE_MS / 1000.0
+    window.after(LOOP_PROBE_MS, probe_loop_lag)
+
+
+def reset_mixer_stall() -> None:
+    """Forget the reference point; play() and seeks legitimately move get_pos() backwards."""
+    global last_mixer_pos
+    last_mixer_pos = (-1, 0.0)
+
+
+def check_mixer_stall(pos_ms: int) -> None:
+    """Count an underrun when the mixer position jumps backwards.
+    get_pos() fills the time since the last audio callback with wall-clock time, so during
+    a stall it keeps advancing; when the callback catches up it snaps back to the real
+    position. Jitter of a few ms is normal, so only steps past MIXER_STALL_BACKSTEP_MS count.
+    pos_ms < 0 (not playing) just resets the reference point."""
+    global last_mixer_pos
+    prev_pos, _ = last_mixer_pos
+    last_mixer_pos = (pos_ms, time.perf_counter())
+    if prev_pos < 0 or pos_ms < 0:
+        return
+    if prev_pos - pos_ms > MIXER_STALL_BACKSTEP_MS:
+        profile_count("mixer.underrun")
+
+
+def set_profiling(enabled: bool) -> None:
+    global profiling_enabled
+    profiling_enabled = enabled
+    reset_mixer_stall()
+    if enabled and not loop_probe_due:
+        probe_loop_lag()
+
+
+def toggle_profiling(event=None) -> None:
+    set_profiling(not profiling_enabled)
+    flash_status("Profiling on." if profiling_enabled else "Profiling off.", 1500)
+
+
+def refresh_profile_overlay() -> None:
+    if profile_window is None or profile_text is None:
+        return
+    lines = [] if profiling_enabled else ["(profiling off -- F12 to enable)", ""]
+    for name, h in sorted(profile_hists.items()):
+        s = h.summary()
+        lines.append(f"{name:<26} n={s['count']:<6} p50={s['p50_ms']:<7g} p95={s['p95_ms']:<7g} max={s['max_ms']:g}")
+    for name, n in sorted(profile_counters.items()):
+        lines.append(f"{name:<26} {n}")
+    lines.append("")
+    lines.append(f"memory {memory_budget.used / 1048576:.1f} / {memory_budget.budget / 1048576:.0f} MB")
+    for name, st in sorted(memory_budget.stats.items()):
+        lines.append(
+            f"  {name:<12} {st['bytes'] / 1048576:7.2f} MB {st['items']:>6} items "
+            f"hit {st['hits']} miss {st['misses']} evict {st['evictions']}"
+        )
+    profile_text.configure(state="normal")
+    profile_text.delete("1.0", "end")
+    profile_text.insert("end", "\n".join(lines) or "(no samples yet)")
+    profile_text.configure(state="disabled")
+    profile_window.after(1000, refresh_profile_overlay)
+
+
+def close_profile_overlay() -> None:
+    global profile_window, profile_text
+    if profile_window is not None:
+        profile_window.destroy()
+    profile_window = None
+    profile_text = None
+
+
+def dump_profile_button() -> None:
+    if dump_profile():
+        flash_status("Profile written.", 1500)
+    else:
+        flash_status("Could not write profile.", 2500)
+
+
+def toggle_profile_overlay(event=None) -> None:
+    global profile_window, profile_text
+    if profile_window is not None:
+        close_profile_overlay()
+        return
+
+    profile_window = CTkToplevel(window)
+    profile_window.title("Profiler")
+    profile_window.geometry("620x360")
+    profile_window.configure(fg_color="black")
+    profile_window.protocol("WM_DELETE_WINDOW", close_profile_overlay)
+
+    profile_text = CTkTextbox(profile_window, font=("Consolas", 12), fg_color="black", text_color="#00FF00")
+    profile_text.pack(fill="both", expand=True, padx=4, pady=(4, 2))
+
+    CTkButton(
+        profile_window, text="Dump to file", command=dump_profile_button,
+        text_color="black", fg_color="#00FFAA", corner_radius=0,
+    ).pack(pady=(2, 6))
+
+    refresh_profile_overlay()
+
+
+# =========================
+# Duplicate detection (fingerprints + LSH buckets)
+# =========================
+fingerprints: dict[str, list] = {}     # filepath -> [mtime, length, fingerprint hex]
+
+
+def load_fingerprints() -> None:
+    global fingerprints
+    fingerprints = load_json_cache(FINGERPRINT_FILE)
+
+
+def stale_fingerprint_paths(paths) -> list[str]:
+    out = []
+    for path in paths:
+        rec = fingerprints.get(path)
+        try:
+            if rec is None or rec[0] != os.path.getmtime(path):
+                out.append(path)
+        except OSError:
+            continue
+    return out
+
+
+def band_probes(band_bits: int, radius: int) -> list[int]:
+    """Every band_bits-wide mask with at most `radius` bits set."""
+    masks = [0]
+    for _ in range(radius):
+        masks = sorted(set(masks) | {m | (1 << b) for m in masks for b in range(band_bits)})
+    return masks
+
+
+def popcount64(x: "np.ndarray") -> "np.ndarray":
+    if hasattr(np, "bitwise_count"):       # NumPy 2.0+
+        return np.bitwise_count(x)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[x.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def find_duplicate_groups(paths) -> list[list[str]]:
+    """Group near-identical tracks. Each 64-bit fingerprint is split into FP_BANDS bands;
+    two fingerprints within FP_MAX_HAMMING bits must agree to FP_PROBE_RADIUS bits in some
+    band. The radius is split: every track is filed under its band values and their
+    neighbours up to half of it, and probes with neighbours up to the other half
+    (multi-probe LSH), so only tracks found that way are compared. Never all-pairs."""
+    band_bits = -(-FP_BITS // FP_BANDS)
+    mask = (1 << band_bits) - 1
+    spread = np.array(band_probes(band_bits, FP_PROBE_RADIUS - FP_PROBE_RADIUS // 2), dtype=np.intp)
+    probes = band_probes(band_bits, FP_PROBE_RADIUS // 2)
+
+    keep: dict[str, tuple[int, float]] = {}
+    for path in paths:
+        rec = fingerprints.get(path)
+        if rec and rec[2] is not None:
+            keep[path] = (int(rec[2], 16), rec[1])
+    names = list(keep)
+    n = len(names)
+    if n < 2:
+        return []
+    fps = np.array([keep[p][0] for p in names], dtype=np.uint64)
+    lengths = np.array([keep[p][1] for p in names], dtype=np.float64)
+    rows = np.arange(n)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for b in range(FP_BANDS):
+        keys = ((fps >> np.uint64(b * band_bits)) & np.uint64(mask)).astype(np.intp)
+        filed = (keys[None, :] ^ spread[:, None]).ravel()
+        owner = np.tile(rows, len(spread))
+        order = owner[np.argsort(filed)]
+        count = np.bincount(filed, minlength=mask + 1)
+        start = np.cumsum(count) - count            # first slot of each filed value in `order`
+        for probe in probes:
+            q = keys ^ probe
+            hits = count[q]
+            total = int(hits.sum())
+            if not total:
+                continue
+            left = np.repeat(rows, hits)
+            slot = np.repeat(start[q], hits) + (np.arange(total) - np.repeat(np.cumsum(hits) - hits, hits))
+            right = order[slot]
+            pair = left < right
+            left, right = left[pair], right[pair]
+            near = ((popcount64(fps[left] ^ fps[right]) <= FP_MAX_HAMMING)
+                    & (np.abs(lengths[left] - lengths[right]) <= FP_MAX_LENGTH_DIFF))
+            for i, j in zip(left[near].tolist(), right[near].tolist()):
+                parent[find(i)] = find(j)
+
+    groups: dict[int, list[str]] = {}
+    for i, path in enumerate(names):
+        groups.setdefault(find(i), []).append(path)
+    return [sorted(g) for g in groups.values() if len(g) > 1]
+
+
+def show_duplicates(groups: list[list[str]]) -> None:
+    path_to_title = {path: title for title, path in song_map.items()}
+
+    top = CTkToplevel(window)
+    top.title("Duplicates")
+    top.geometry("620x400")
+    top.configure(fg_color="black")
+
+    box = CTkTextbox(top, font=("Consolas", 12), fg_color="black", text_color="#00FF00")
+    box.pack(fill="both", expand=True, padx=4, pady=4)
+    lines = []
+    for n, group in enumerate(groups, 1):
+        lines.append(f"#{n}")
+        lines.extend(f"   {path_to_title.get(p, os.path.basename(p))}  ({p})" for p in group)
+    box.insert("end", "\n".join(lines) if lines else "No duplicates found.")
+    box.configure(state="disabled")
+
+
+def merge_fingerprints(results: dict) -> None:
+    for path, rec in results.items():
+        if rec is not None:
+            fingerprints[path] = rec
+    save_json_cache(FINGERPRINT_FILE, fingerprints)
+
+
+def find_duplicates(event=None) -> None:
+    if not song_map:
+        flash_status("Playlist is empty.", 2000)
+        return
+
+    paths = list(song_map.values())
+    todo = stale_fingerprint_paths(paths)
+    if not todo:
+        if np is None:
+            flash_status("Duplicate detection needs NumPy.", 2500)
+            return
+        show_duplicates(find_duplicate_groups(paths))
+        return
+    start_library_job("fingerprint", todo, on_done=lambda: show_duplicates(find_duplicate_groups(paths)))
+
+
+# =========================
+# Library jobs (chunked on the process pool, checkpointed, cancellable)
+# =========================
+# kind -> (status label, paths per chunk, needs NumPy)
+JOB_KINDS = {
+    "tags": ("Reading tags", 256, False),
+    "thumbs": ("Rendering thumbnails", 64, False),
+    "loudness": ("Analysing loudness", 8, True),
+    "fingerprint": ("Fingerprinting", 32, True),
 }
+JOB_POLL_MS = 200
+JOB_IN_FLIGHT_PER_WORKER = 2           # chunks queued per worker; waveforms etc. can slot in between
+LOUDNESS_TARGET_DB = -20.0             # RMS dBFS that analysed tracks without ReplayGain are levelled to
+LOUDNESS_MAX_GAIN_DB = 12.0
+library_info: dict[str, dict] | None = None     # filepath -> tag fields from job_read_tags (+ loudness_db/loudness_mtime); loaded on first use
+active_job: "LibraryJob | None" = None
+
+
+class LibraryJob:
+    """A library-wide task cut into chunks that run on the process pool.
+
+    Only JOB_IN_FLIGHT_PER_WORKER chunks per worker are submitted at a time and `poll` tops
+    the pool up, so other pool work (waveforms) never queues behind the whole job. Each
+    finished chunk is folded into `results` on the Tk thread and written as its own file under
+    JOB_DIR/<kind>/, so an interrupted or cancelled job skips it when started again over the
+    same paths. The library data itself is only touched once, by the kind's merge function,
+    when every chunk has come back.
+    """
 
-pause_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/pause.png")), size=(26, 26))
-play_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/play.png")), size=(26, 26))
-prev_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/previous.png")), size=(26, 26))
-next_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/next.png")), size=(26, 26))
-resume_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/resume.png")), size=(26, 26))
-stop_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/stop.png")), size=(26, 26))
-
-prevButton = CTkButton(frame_top, text="", image=prev_icon, command=prev_song, **photo_Button_style)
-playButton = CTkButton(frame_top, text="", image=play_icon, command=lambda: play_song(None, update_cursor=True), **photo_Button_style)
-nextButton = CTkButton(frame_top, text="", image=next_icon, command=next_song, **photo_Button_style)
-
-pauseButton = CTkButton(frame_middle, text="", image=pause_icon, command=pause_song, **photo_Button_style)
-resumeButton = CTkButton(frame_middle, text="", image=resume_icon, command=resume_song, **photo_Button_style)
-stopButton = CTkButton(frame_middle, text="", image=stop_icon, command=stop_song, **photo_Button_style)
-
-prevButton.grid(row=0, column=0, padx=5, pady=2)
-playButton.grid(row=0, column=1, padx=5, pady=2)
-nextButton.grid(row=0, column=2, padx=5, pady=2)
-pauseButton.grid(row=0, column=0, padx=5, pady=2)
-resumeButton.grid(row=0, column=1, padx=5, pady=2)
-stopButton.grid(row=0, column=2, padx=5, pady=2)
-
-volume = CTkSlider(
-    window,
-    from_=0,
-    to=10,
-    orientation="Horizontal",
-    fg_color="black",
-    progress_color="#00FF00",
-    button_color="#003300",
-    border_color="#00FF00",
-    button_hover_color="#004400",
-    button_length=2,
-    width=200,
-    height=10,
-    border_width=1,
-    command=set_volume,
-)
-volume.set(5)
-volume.pack(pady=5)
-
-bottom_bar = CTkFrame(window, fg_color="black")
-bottom_bar.pack(side="bottom", fill="x", padx=5, pady=5)
-bottom_bar.grid_columnconfigure(0, weight=1)
-bottom_bar.grid_columnconfigure(1, weight=1)
-bottom_bar.grid_columnconfigure(2, weight=1)
-bottom_bar.grid_rowconfigure(0, weight=1)
-bottom_bar.grid_rowconfigure(1, weight=1)
-
-left_section = CTkFrame(bottom_bar, fg_color="black", width=200, height=80, border_width=1, border_color="#00FFAA", corner_radius=0)
-left_section.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=(5, 0), pady=5)
-left_section.grid_propagate(False)
-
-middle_section = CTkFrame(bottom_bar, fg_color="black", width=200, height=80, border_width=1, border_color="#00FFAA", corner_radius=0)
-middle_section.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=(2, 2), pady=5)
-middle_section.grid_propagate(False)
-
-right_section = CTkFrame(bottom_bar, fg_color="black", width=200, height=80, border_width=1, border_color="#00FFAA", corner_radius=0)
-right_section.grid(row=0, column=2, rowspan=2, sticky="nsew", padx=(0, 5), pady=5)
-right_section.grid_propagate(False)
-
-status_label = CTkLabel(left_section, text="Ready...", font=("Consolas", 14), text_color="#00FF00", fg_color="black", anchor="w")
-status_label.grid(row=0, column=0, sticky="w", padx=(4, 2), pady=(2, 0))
-
-next_song_label = CTkLabel(left_section, text="No songs queued.", font=("Consolas", 14), text_color="#00FF00", fg_color="black", anchor="w")
-next_song_label.grid(row=1, column=0, sticky="w", padx=(4, 2), pady=(0, 2))
-
-middle_gif_label = CTkLabel(middle_section, text="")
-middle_gif_label.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=2, pady=2)
-
-equalizer_gif = GifPlayer(window, middle_gif_label, os.path.join(APP_DIR, "gifs/equalizer.gif"), (269, 75))
-#equalizer_gif.active_frame_indices = list(range(10, 25))  # only these animate when playing
-equalizer_gif.seq_startup = list(range(0, 10))          # 0..9 (once)
-equalizer_gif.seq_running = list(range(10, 26))         # 10..25 (loop)
-equalizer_gif.seq_stop = list(range(12, 9, -1))       
-equalizer_gif.pause_frame_index = 12
-equalizer_gif.stop("stop_reverse")
-
-queue_display = CTkListbox(
-    right_section,
-    width=252,
-    height=68,
-    font=("Consolas", 14),
-    fg_color="black",
-    text_color="#00FF00",
-    corner_radius=0,
-)
-queue_display.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=(1, 3), pady=(1, 3))
-refresh_queue_mini()
+    def __init__(self, kind: str, paths: list[str], on_done=None):
+        self.kind = kind
+        self.label, chunk_size, _ = JOB_KINDS[kind]
+        self.paths = paths
+        self.chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+        self.on_done = on_done
+        self.key = hashlib.sha1("\n".join(paths).encode("utf-8", "surrogateescape")).hexdigest()
+        self.checkpoint_dir = os.path.join(JOB_DIR, kind)
+
+        self.done: set[int] = set()
+        self.results: dict = {}
+        self.todo: list[int] = []          # chunk indices not yet submitted, next last
+        self.pending: dict = {}            # future -> chunk index
+        self.failed = 0
+        self.cancelled = False
+
+        self.done_files = 0
+        self.files = 0                     # this run only, for the rates
+        self.nbytes = 0
+        self.started = 0.0
+
+    def load_checkpoint(self) -> None:
+        marker = os.path.join(self.checkpoint_dir, "job.json")
+        if load_json_cache(marker).get("key") != self.key:
+            self.drop_checkpoint()
+            save_json_cache(marker, {"key": self.key})
+            return
+        for i, chunk in enumerate(self.chunks):
+            path = os.path.join(self.checkpoint_dir, f"{i}.json")
+            if os.path.exists(path):
+                self.results.update(load_json_cache(path))
+                self.done.add(i)
+                self.done_files += len(chunk)
+
+    def drop_checkpoint(self) -> None:
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def start(self) -> None:
+        self.load_checkpoint()
+        self.todo = [i for i in reversed(range(len(self.chunks))) if i not in self.done]
+        self.started = time.monotonic()
+        self.top_up()
+        self.poll()
+
+    def top_up(self) -> None:
+        limit = JOB_IN_FLIGHT_PER_WORKER * process_pool_workers()
+        while self.todo and len(self.pending) < limit:
+            i = self.todo[-1]
+            self.pending[submit_to_pool(run_job_chunk, self.kind, self.chunks[i])] = i
+            self.todo.pop()
+
+    def progress_text(self) -> str:
+        elapsed = max(time.monotonic() - self.started, 1e-3)
+        return (f"{self.label}: {self.done_files}/{len(self.paths)} · "
+                f"{self.files / elapsed:.0f} files/s · {self.nbytes / elapsed / 1e6:.1f} MB/s")
+
+    def poll(self) -> None:
+        if self.cancelled:
+            return
+        for fut in [f for f in self.pending if f.done()]:
+            i = self.pending.pop(fut)
+            try:
+                results, nbytes = fut.result()
+            except Exception:
+                self.failed += 1           # no chunk file, so the next run retries it
+                continue
+            save_json_cache(os.path.join(self.checkpoint_dir, f"{i}.json"), results)
+            self.results.update(results)
+            self.done.add(i)
+            self.done_files += len(self.chunks[i])
+            self.files += len(self.chunks[i])
+            self.nbytes += nbytes
+        try:
+            self.top_up()
+        except BrokenProcessPool:
+            self.failed += len(self.todo)  # the rebuilt pool died too; leave them for the next run
+            self.todo.clear()
+
+        if not self.pending:
+            self.finish()
+            return
+        set_status(self.progress_text())
+        window.after(JOB_POLL_MS, self.poll)
+
+    def finish(self) -> None:
+        global active_job
+        active_job = None
+        summary = self.progress_text()
+        merge = JOB_MERGERS.get(self.kind)
+        if merge is not None:
+            merge(self.results)
+        if self.failed:
+            flash_status(f"{summary} · {self.failed} chunk(s) failed, run again to retry", 4000)
+        else:
+            self.drop_checkpoint()
+            flash_status(summary, 3000)
+        if self.on_done is not None:
+            self.on_done()
+
+    def cancel(self) -> None:
+        """Chunks already running finish in their workers but are discarded; nothing is merged."""
+        global active_job
+        self.cancelled = True
+        for fut in self.pending:
+            fut.cancel()
+        self.pending.clear()
+        self.todo.clear()
+        active_job = None
+
+
+def start_library_job(kind: str, paths: list[str], on_done=None) -> bool:
+    global active_job
+    if active_job is not None:
+        flash_status(f"Busy: {active_job.label.lower()}... (F8 cancels)", 2000)
+        return False
+    if JOB_KINDS[kind][2] and np is None:
+        flash_status(f"{JOB_KINDS[kind][0]} needs NumPy.", 2500)
+        return False
+    if not paths:
+        flash_status("Nothing to do.", 1500)
+        return False
+    job = LibraryJob(kind, paths, on_done)
+    try:
+        job.start()
+    except BrokenProcessPool:
+        job.cancel()
+        flash_status("Background workers keep failing.", 2500)
+        return False
+    if not job.cancelled and job.pending:
+        active_job = job                   # finish() already ran if nothing needed submitting
+    return True
+
+
+def cancel_library_job(event=None) -> None:
+    if active_job is None:
+        return
+    job = active_job
+    job.cancel()
+    flash_status(f"{job.label} cancelled at {job.done_files}/{len(job.paths)}; it resumes from there.", 3000)
+
+
+def get_library_info() -> dict[str, dict]:
+    global library_info
+    if library_info is None:
+        library_info = load_json_cache(LIBRARY_FILE)
+    return library_info
+
+
+def library_entry(path: str) -> dict | None:
+    """One track's library record. Served from the snapshot while the JSON hasn't been needed,
+    so a cold start doesn't parse the whole library to level one track."""
+    if library_info is None and library_snapshot is not None:
+        row = library_snapshot.row_of_path(path)
+        if row is not None:
+            return library_snapshot.entry(row)
+    return get_library_info().get(path)
+
+
+def merge_tags(results: dict) -> None:
+    info = get_library_info()
+    for path, rec in results.items():
+        if rec is None:
+            continue
+        info.setdefault(path, {}).update(rec)
+        track_meta.discard(path)           # re-read on next touch
+    save_json_cache(LIBRARY_FILE, info)
+    refresh_library_snapshot()
+
+
+def merge_loudness(results: dict) -> None:
+    info = get_library_info()
+    for path, rec in results.items():
+        if rec is None:
+            continue
+        entry = info.setdefault(path, {})
+        entry["loudness_mtime"], entry["loudness_db"] = rec
+    save_json_cache(LIBRARY_FILE, info)
+    refresh_library_snapshot()
+
+
+JOB_MERGERS = {
+    "tags": merge_tags,
+    "loudness": merge_loudness,
+    "fingerprint": merge_fingerprints,
+}
+
+
+def analysed_gain_db(path: str, mtime: float) -> float:
+    """Gain from the loudness job for tracks that carry no ReplayGain tag."""
+    entry = library_entry(path)
+    if not entry or entry.get("loudness_mtime") != mtime:
+        return 0.0
+    gain = LOUDNESS_TARGET_DB - entry["loudness_db"]
+    return max(-LOUDNESS_MAX_GAIN_DB, min(gain, LOUDNESS_MAX_GAIN_DB))
+
+
+def rescan_library(event=None) -> None:
+    """Re-scan the music folder, then re-read every track's tags in the background."""
+    if active_job is not None:
+        flash_status(f"Busy: {active_job.label.lower()}... (F8 cancels)", 2000)
+        return
+    folder = load_config()
+    if not folder or not os.path.isdir(folder):
+        flash_status("No music folder to rescan.", 2000)
+        return
+    load_music_from_folder(folder, read_tags=False)
+    paths = list(song_map.values())
+
+    def prune():
+        info = get_library_info()
+        live = set(paths)
+        for path in [p for p in info if p not in live]:
+            del info[path]
+        save_json_cache(LIBRARY_FILE, info)
+
+    start_library_job("tags", paths, on_done=prune)
+
+
+def rebuild_thumbnails(event=None) -> None:
+    start_library_job("thumbs", list(song_map.values()))
+
+
+def analyse_loudness(event=None) -> None:
+    todo = []
+    for path in song_map.values():
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if (library_entry(path) or {}).get("loudness_mtime") != mtime:
+            todo.append(path)
+    if not todo:
+        flash_status("Loudness is up to date.", 1500)
+        return
+    start_library_job("loudness", todo)
 
 
 # =========================
-# Bindings
+# Library snapshot (mmap'd columns for an instant cold start)
 # =========================
-playlist.bind("<Double-Button-1>", play_selected)
-playlist.bind("<Button-3>", add_selected_to_queue)
+SNAPSHOT_FILE = os.path.join(CACHE_DIR, "library.snap")
+SNAPSHOT_MAGIC = b"MP3SNAP1"
+# magic, rows, blob bytes, folder mtime, folder path bytes; the folder path follows the header
+SNAPSHOT_HEADER = struct.Struct("=8sIIdI")
+# (name, array typecode, extra rows) in file order, each column 8-byte aligned. *_off are uint32
+# offsets into the blob (titles, then paths, then casefolded titles); *_order are row indices
+# sorted by title / path bytes so lookups can bisect without building a dict.
+SNAPSHOT_COLUMNS = (
+    ("durations", "f", 0),
+    ("mtimes", "d", 0),
+    ("loudness", "f", 0),
+    ("loudness_mtimes", "d", 0),
+    ("title_off", "I", 1),
+    ("path_off", "I", 1),
+    ("fold_off", "I", 1),
+    ("title_order", "I", 0),
+    ("path_order", "I", 0),
+)
+library_snapshot: "LibrarySnapshot | None" = None
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
 
-window.bind("<space>", toggle_play_pause)
-window.bind("<Tab>", lambda e: stop_song())
-window.bind("<Escape>", lambda e: window.destroy())
+def encode_path(text: str) -> bytes:
+    return text.encode("utf-8", "surrogateescape")
+
+
+class LibrarySnapshot:
+    """Read-only view of library.snap. Columns are memoryviews straight onto the mmap and
+    strings are decoded per row on access, so opening it costs the same for 50 or 50k tracks."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.n, blob_len, self.folder_mtime, folder_len = SNAPSHOT_HEADER.unpack_from(self.mm, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("not a library snapshot")
+            pos = SNAPSHOT_HEADER.size
+            self.folder = self.mm[pos:pos + folder_len].decode("utf-8", "surrogateescape")
+            pos = _align8(pos + folder_len)
+
+            self.view = memoryview(self.mm)
+            self.columns: list[memoryview] = []
+            for name, code, extra in SNAPSHOT_COLUMNS:
+                size = (self.n + extra) * array(code).itemsize
+                if pos + size > len(self.mm):
+                    raise ValueError("truncated library snapshot")
+                column = self.view[pos:pos + size].cast(code)
+                self.columns.append(column)
+                setattr(self, name, column)
+                pos = _align8(pos + size)
+            self.blob = pos
+            if pos + blob_len > len(self.mm):
+                raise ValueError("truncated library snapshot")
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        # exported memoryviews must go first or the mmap refuses to close
+        for column in getattr(self, "columns", []):
+            column.release()
+        if hasattr(self, "view"):
+            self.view.release()
+        self.mm.close()
+
+    def _text(self, offsets: memoryview, row: int) -> bytes:
+        return self.mm[self.blob + offsets[row]:self.blob + offsets[row + 1]]
+
+    def title(self, row: int) -> str:
+        return self._text(self.title_off, row).decode("utf-8", "surrogateescape")
+
+    def path(self, row: int) -> str:
+        return self._text(self.path_off, row).decode("utf-8", "surrogateescape")
+
+    def _find(self, order: memoryview, offsets: memoryview, key: bytes) -> int | None:
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._text(offsets, order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n and self._text(offsets, order[lo]) == key:
+            return order[lo]
+        return None
+
+    def row_of(self, title: str) -> int | None:
+        return self._find(self.title_order, self.title_off, encode_path(title))
+
+    def row_of_path(self, path: str) -> int | None:
+        return self._find(self.path_order, self.path_off, encode_path(path))
+
+    def entry(self, row: int) -> dict:
+        """The row as a library_info-style record (unknown fields left out)."""
+        out = {"mtime": self.mtimes[row]}
+        if self.durations[row] > 0:
+            out["length"] = self.durations[row]
+        if self.loudness_mtimes[row]:
+            out["loudness_mtime"] = self.loudness_mtimes[row]
+            out["loudness_db"] = self.loudness[row]
+        return out
+
+    def search(self, text: str) -> list[int]:
+        """Rows whose title contains `text` (case-insensitive), found by scanning the
+        casefolded blob in place rather than decoding every title."""
+        needle = encode_path(text.casefold())
+        if not needle:
+            return []
+        offsets = self.fold_off
+        pos = self.blob + offsets[0]
+        end = self.blob + offsets[self.n]
+        hits = []
+        while True:
+            at = self.mm.find(needle, pos, end)
+            if at < 0:
+                return hits
+            row = bisect_right(offsets, at - self.blob) - 1
+            row_end = self.blob + offsets[row + 1]
+            if at + len(needle) <= row_end:
+                hits.append(row)
+                pos = row_end
+            else:
+                pos = at + 1                # straddled two titles
 
-window.bind("<Right>", lambda e: skip_seconds(10))
-window.bind("<Left>", lambda e: skip_seconds(-10))
 
-window.bind("<Control-Right>", next_song)
-window.bind("<Control-Left>", prev_song)
+class SnapshotTitles(Sequence):
+    """song_names served from the snapshot."""
 
-window.bind("<c>", clear_queue)
+    def __init__(self, snap: LibrarySnapshot):
+        self.snap = snap
+
+    def __len__(self) -> int:
+        return self.snap.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.snap.title(j) for j in range(*i.indices(self.snap.n))]
+        if i < 0:
+            i += self.snap.n
+        if not 0 <= i < self.snap.n:
+            raise IndexError(i)
+        return self.snap.title(i)
+
+    def __contains__(self, title) -> bool:
+        return isinstance(title, str) and self.snap.row_of(title) is not None
+
+    def index(self, title, *args) -> int:
+        row = self.snap.row_of(title) if isinstance(title, str) else None
+        if row is None:
+            raise ValueError(f"{title!r} is not in the library")
+        return row
+
+
+class SnapshotMap(Mapping):
+    """song_map (title -> path) served from the snapshot."""
+
+    def __init__(self, snap: LibrarySnapshot):
+        self.snap = snap
+
+    def __getitem__(self, title: str) -> str:
+        row = self.snap.row_of(title) if isinstance(title, str) else None
+        if row is None:
+            raise KeyError(title)
+        return self.snap.path(row)
+
+    def __iter__(self):
+        return (self.snap.title(i) for i in range(self.snap.n))
+
+    def __len__(self) -> int:
+        return self.snap.n
+
+    # row order, without a bisect per key
+    def values(self):
+        return (self.snap.path(i) for i in range(self.snap.n))
+
+    def items(self):
+        return ((self.snap.title(i), self.snap.path(i)) for i in range(self.snap.n))
+
+
+def folder_mtime(folder: str) -> float | None:
+    try:
+        return os.stat(folder).st_mtime
+    except OSError:
+        return None
+
+
+def write_library_snapshot(path: str, folder: str, mtime: float, titles: list[str], paths: list[str]) -> str:
+    """Write the snapshot next to `path` and return the temp file name."""
+    info = get_library_info()
+    columns = {name: array(code) for name, code, _ in SNAPSHOT_COLUMNS}
+    blobs = ([encode_path(t) for t in titles], [encode_path(p) for p in paths],
+             [encode_path(t.casefold()) for t in titles])
+    blob = bytearray()
+    for name, parts in zip(("title_off", "path_off", "fold_off"), blobs):
+        column = columns[name]
+        for part in parts:
+            column.append(len(blob))
+            blob += part
+        column.append(len(blob))
+    columns["title_order"].extend(sorted(range(len(titles)), key=blobs[0].__getitem__))
+    columns["path_order"].extend(sorted(range(len(paths)), key=blobs[1].__getitem__))
+
+    nan = float("nan")
+    for track_path in paths:
+        try:
+            track_mtime = os.stat(track_path).st_mtime
+        except OSError:
+            track_mtime = 0.0
+        entry = info.get(track_path) or {}
+        # a tag read from before the file last changed has a stale length
+        length = entry.get("length") if entry.get("mtime") == track_mtime else known_length(track_path)
+        columns["durations"].append(length if length and length > 0 else -1.0)
+        columns["mtimes"].append(track_mtime)
+        columns["loudness"].append(entry.get("loudness_db", nan))
+        columns["loudness_mtimes"].append(entry.get("loudness_mtime") or 0.0)
+
+    folder_bytes = encode_path(folder)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(titles), len(blob), mtime, len(folder_bytes)))
+        f.write(folder_bytes)
+        for name, _, _ in SNAPSHOT_COLUMNS:
+            f.write(b"\0" * (_align8(f.tell()) - f.tell()))
+            columns[name].tofile(f)
+        f.write(b"\0" * (_align8(f.tell()) - f.tell()))
+        f.write(blob)
+    return tmp
+
+
+def install_library_snapshot(folder: str, mtime: float, titles: list[str], paths: list[str]) -> None:
+    """Write the snapshot and swap it in; song_names/song_map/library_map are re-pointed if they
+    were views of the old one. The old mapping is left to be freed once nothing holds it, and only
+    closed early where the platform won't replace a mapped file (Windows)."""
+    global library_snapshot, song_names, song_map, library_map
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = write_library_snapshot(SNAPSHOT_FILE, folder, mtime, titles, paths)
+    except (OSError, OverflowError):
+        return
+
+    in_use = isinstance(song_names, SnapshotTitles)
+    indexed = isinstance(library_map, SnapshotMap)
+    old, library_snapshot = library_snapshot, None
+    try:
+        try:
+            os.replace(tmp, SNAPSHOT_FILE)
+        except PermissionError:
+            if old is None:
+                raise
+            old.close()
+            os.replace(tmp, SNAPSHOT_FILE)
+        library_snapshot = LibrarySnapshot(SNAPSHOT_FILE)
+    except (OSError, ValueError):
+        library_snapshot = None
+    if in_use or indexed:
+        if library_snapshot is not None:
+            fresh_names, fresh_map = SnapshotTitles(library_snapshot), SnapshotMap(library_snapshot)
+        else:
+            fresh_names, fresh_map = list(titles), dict(zip(titles, paths))
+        if in_use:
+            song_names, song_map = fresh_names, fresh_map
+        if indexed:
+            library_map = fresh_map
+
+
+def refresh_library_snapshot() -> None:
+    """Re-export after library.json changed, keeping the snapshot's own rows."""
+    snap = library_snapshot
+    if snap is None:
+        return
+    titles = [snap.title(i) for i in range(snap.n)]
+    paths = [snap.path(i) for i in range(snap.n)]
+    install_library_snapshot(snap.folder, snap.folder_mtime, titles, paths)
+
+
+def load_library_snapshot(folder: str) -> bool:
+    """Show the library straight from the snapshot if it still matches the folder."""
+    global library_snapshot
+    mtime = folder_mtime(folder)
+    try:
+        snap = LibrarySnapshot(SNAPSHOT_FILE)
+    except (OSError, ValueError, struct.error):
+        return False
+    if snap.folder != folder or snap.folder_mtime != mtime:
+        snap.close()
+        return False
+    library_snapshot = snap
+    set_library(SnapshotMap(snap), SnapshotTitles(snap))
+    return True
+
+
+# ---- Playlist search ----
+search_text = ""
+search_hits: list[int] = []
+search_pos = 0
+
+
+def search_titles(text: str) -> list[int]:
+    if isinstance(song_names, SnapshotTitles):
+        return song_names.snap.search(text)
+    needle = text.casefold()
+    return [i for i, title in enumerate(song_names) if needle in title.casefold()]
+
+
+def show_search_hit() -> None:
+    text = search_text
+    if not text:
+        set_default_status()
+    elif not search_hits:
+        set_status(f"No match for “{text}”")
+    else:
+        playlist_select_index(search_hits[search_pos])
+        set_status(f"Match {search_pos + 1}/{len(search_hits)}")
+
+
+def on_search_changed(event=None) -> None:
+    global search_text, search_hits, search_pos
+    text = search_entry.get().strip()
+    if text == search_text:
+        return
+    search_text = text
+    search_hits = search_titles(text) if text else []
+    search_pos = 0
+    show_search_hit()
+
+
+def search_next(event=None) -> str:
+    global search_pos
+    if search_hits:
+        search_pos = (search_pos + 1) % len(search_hits)
+    show_search_hit()
+    return "break"
+
+
+def search_leave(event=None) -> str:
+    search_entry.delete(0, "end")
+    on_search_changed()
+    window.focus_set()
+    return "break"
 
 
 # =========================
-# Startup
+# UI Build (same layout architecture)
 # =========================
-update_progress()
+# Process-pool workers re-import this script as __mp_main__ (spawn), so the
+# window is only built when it is run directly.
+if __name__ == "__main__":
+    window = CTk()
+    window.geometry("850x780")
+    window.title("Music Player")
+    window.configure(fg_color="black")
+
+    icon = PhotoImage(file=os.path.join(APP_DIR, "icons/music_note_icon.png"))
+    window.iconphoto(True, icon)
+
+    label = CTkLabel(
+        window,
+        text="MUSIC PLAYER",
+        font=("Monospace", 45, "bold"),
+        text_color="#00FFAA",
+    )
+    label.pack(pady=(10, 2))
+
+    playlist_outer = CTkFrame(
+        window,
+        fg_color="black",
+        border_color="#00FFAA",
+        border_width=3,
+        corner_radius=0
+    )
+    playlist_outer.grid_columnconfigure(0, weight=1)
+    playlist_outer.grid_rowconfigure(0, weight=1)
+    playlist_outer.pack(padx=20, pady=(5, 10), fill="x")
+
+    playlist_inner = CTkFrame(
+        playlist_outer,
+        fg_color="black",
+        border_color="#222222",
+        border_width=4,
+        corner_radius=0
+    )
+    playlist_inner.columnconfigure(0, weight=3)
+    playlist_inner.columnconfigure(1, weight=2)
+    playlist_inner.rowconfigure(0, weight=1)
+    playlist_inner.grid(column=0, row=0, padx=4, pady=4, sticky="nsew")
+
+    playlist_left = CTkFrame(playlist_inner, fg_color="black", corner_radius=0)
+    playlist_left.grid(row=0, column=0, sticky="nsew", padx=(4, 2), pady=4)
+
+    playlist_label = CTkLabel(
+        playlist_left,
+        text="Playlist",
+        font=("Helvetica", 20, "bold"),
+        text_color="#00FFAA",
+        fg_color="black",
+        anchor="n",
+    )
+    playlist_label.pack(anchor="n", pady=(6, 2))
+
+    playlist = PlaylistView(
+        playlist_left,
+        rows=lambda: song_names,
+        width=400,
+        height=220,
+        font=("Helvetica", 18),
+        fg_color="black",
+        text_color="#00FFAA",
+        highlight_color="#003300",
+        hover_color="#004400",
+    )
+    playlist.pack(padx=2, pady=(2, 4), fill="x")
+
+    search_entry = CTkEntry(
+        playlist_left,
+        width=400,
+        placeholder_text="Search  ( / )",
+        fg_color="black",
+        text_color="#00FFAA",
+        border_color="#003300",
+    )
+    search_entry.pack(padx=2, pady=(0, 4), fill="x")
+    # drop the window's tag so typing here doesn't fire the single-key shortcuts
+    search_entry._entry.bindtags(tuple(t for t in search_entry._entry.bindtags() if t != str(window)))
+    search_entry.bind("<Return>", search_next)
+    search_entry.bind("<Escape>", search_leave)
+    search_entry.bind("<KeyRelease>", on_search_changed)
+
+    load_music_btn = CTkButton(playlist_left, text="Load Music", command=load_music_button)
+    load_music_btn.configure(
+        font=("Helvetica", 16, "bold"),
+        text_color="black",
+        fg_color="#00FFAA",
+        corner_radius=0,
+        anchor="s",
+    )
+    load_music_btn.pack(anchor="s", padx=6, pady=(2, 6))
+
+    playlist_right = CTkFrame(
+        playlist_inner,
+        fg_color="black",
+        border_color="#00FFAA",
+        border_width=2,
+        corner_radius=0
+    )
+    playlist_right.grid(row=0, column=1, sticky="nsew", padx=(2, 4), pady=4)
+    playlist_right.configure(width=260)
+    playlist_right.grid_propagate(False)
+
+    album_art_label = CTkLabel(playlist_right, text="")
+    album_art_label.pack(pady=(12, 8))
+
+    placeholder_gif = GifPlayer(window, album_art_label, os.path.join(APP_DIR, "gifs/placeholder.gif"), ART_SIZE)
+    start_placeholder_gif()
+
+    progress_bar = WaveformBar(window, width=500, height=40, on_seek=seek_fraction)
+    progress_bar.set(0)
+    progress_bar.pack(pady=(2, 4))
+
+    lyrics_label = CTkLabel(window, text="", font=("Helvetica", 18, "bold"), text_color="#00FFAA", fg_color="black")
+    lyrics_label.pack()
+    lyrics_next_label = CTkLabel(window, text="", font=("Helvetica", 13), text_color="#007755", fg_color="black")
+    lyrics_next_label.pack(pady=(0, 6))
+
+    frame = CTkFrame(window, fg_color="black")
+    frame.pack(pady=10)
+    frame.grid_rowconfigure(0, weight=1)
+    frame.grid_rowconfigure(1, weight=1)
+    frame.grid_columnconfigure(0, weight=1)
+
+    frame_top = CTkFrame(frame, fg_color="black")
+    frame_top.grid(row=0, column=0, sticky="nsew", pady=(0, 5))
+
+    frame_middle = CTkFrame(frame, fg_color="black")
+    frame_middle.grid(row=1, column=0, sticky="nsew", pady=(0, 5))
+
+    for row_frame in (frame_top, frame_middle):
+        row_frame.grid_columnconfigure(0, weight=1)
+        row_frame.grid_columnconfigure(1, weight=1)
+        row_frame.grid_columnconfigure(2, weight=1)
+
+    photo_Button_style = {
+        "width": 50,
+        "height": 50,
+        "fg_color": "black",
+        "hover_color": "#003300",
+        "border_color": "#00FF00",
+        "border_width": 1,
+        "corner_radius": 0,
+    }
+
+    pause_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/pause.png")), size=(26, 26))
+    play_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/play.png")), size=(26, 26))
+    prev_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/previous.png")), size=(26, 26))
+    next_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/next.png")), size=(26, 26))
+    resume_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/resume.png")), size=(26, 26))
+    stop_icon = CTkImage(Image.open(os.path.join(APP_DIR, "icons/stop.png")), size=(26, 26))
+
+    prevButton = CTkButton(frame_top, text="", image=prev_icon, command=prev_song, **photo_Button_style)
+    playButton = CTkButton(frame_top, text="", image=play_icon, command=lambda: play_song(None, update_cursor=True), **photo_Button_style)
+    nextButton = CTkButton(frame_top, text="", image=next_icon, command=next_song, **photo_Button_style)
+
+    pauseButton = CTkButton(frame_middle, text="", image=pause_icon, command=pause_song, **photo_Button_style)
+    resumeButton = CTkButton(frame_middle, text="", image=resume_icon, command=resume_song, **photo_Button_style)
+    stopButton = CTkButton(frame_middle, text="", image=stop_icon, command=stop_song, **photo_Button_style)
+
+    prevButton.grid(row=0, column=0, padx=5, pady=2)
+    playButton.grid(row=0, column=1, padx=5, pady=2)
+    nextButton.grid(row=0, column=2, padx=5, pady=2)
+    pauseButton.grid(row=0, column=0, padx=5, pady=2)
+    resumeButton.grid(row=0, column=1, padx=5, pady=2)
+    stopButton.grid(row=0, column=2, padx=5, pady=2)
+
+    volume = CTkSlider(
+        window,
+        from_=0,
+        to=10,
+        orientation="Horizontal",
+        fg_color="black",
+        progress_color="#00FF00",
+        button_color="#003300",
+        border_color="#00FF00",
+        button_hover_color="#004400",
+        button_length=2,
+        width=200,
+        height=10,
+        border_width=1,
+        command=set_volume,
+    )
+    volume.set(5)
+    volume.pack(pady=5)
+
+    bottom_bar = CTkFrame(window, fg_color="black")
+    bottom_bar.pack(side="bottom", fill="x", padx=5, pady=5)
+    bottom_bar.grid_columnconfigure(0, weight=1)
+    bottom_bar.grid_columnconfigure(1, weight=1)
+    bottom_bar.grid_columnconfigure(2, weight=1)
+    bottom_bar.grid_rowconfigure(0, weight=1)
+    bottom_bar.grid_rowconfigure(1, weight=1)
+
+    left_section = CTkFrame(bottom_bar, fg_color="black", width=200, height=80, border_width=1, border_color="#00FFAA", corner_radius=0)
+    left_section.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=(5, 0), pady=5)
+    left_section.grid_propagate(False)
+
+    middle_section = CTkFrame(bottom_bar, fg_color="black", width=200, height=80, border_width=1, border_color="#00FFAA", corner_radius=0)
+    middle_section.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=(2, 2), pady=5)
+    middle_section.grid_propagate(False)
+
+    right_section = CTkFrame(bottom_bar, fg_color="black", width=200, height=80, border_width=1, border_color="#00FFAA", corner_radius=0)
+    right_section.grid(row=0, column=2, rowspan=2, sticky="nsew", padx=(0, 5), pady=5)
+    right_section.grid_propagate(False)
+
+    status_label = CTkLabel(left_section, text="Ready...", font=("Consolas", 14), text_color="#00FF00", fg_color="black", anchor="w")
+    status_label.grid(row=0, column=0, sticky="w", padx=(4, 2), pady=(2, 0))
+
+    next_song_label = CTkLabel(left_section, text="No songs queued.", font=("Consolas", 14), text_color="#00FF00", fg_color="black", anchor="w")
+    next_song_label.grid(row=1, column=0, sticky="w", padx=(4, 2), pady=(0, 2))
+
+    middle_gif_label = CTkLabel(middle_section, text="")
+    middle_gif_label.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=2, pady=2)
+
+    equalizer_gif = GifPlayer(window, middle_gif_label, os.path.join(APP_DIR, "gifs/equalizer.gif"), (269, 75))
+    #equalizer_gif.active_frame_indices = list(range(10, 25))  # only these animate when playing
+    equalizer_gif.seq_startup = list(range(0, 10))          # 0..9 (once)
+    equalizer_gif.seq_running = list(range(10, 26))         # 10..25 (loop)
+    equalizer_gif.seq_stop = list(range(12, 9, -1))       
+    equalizer_gif.pause_frame_index = 12
+    equalizer_gif.stop("stop_reverse")
+
+    queue_display = CTkListbox(
+        right_section,
+        width=252,
+        height=68,
+        font=("Consolas", 14),
+        fg_color="black",
+        text_color="#00FF00",
+        corner_radius=0,
+    )
+    queue_display.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=(1, 3), pady=(1, 3))
+    refresh_queue_mini()
 
-last_folder = load_config()
-if last_folder and os.path.isdir(last_folder):
-    load_music_from_folder(last_folder)
 
-window.mainloop()
+    # =========================
+    # Bindings
+    # =========================
+    playlist.bind("<Double-Button-1>", play_selected)
+    playlist.bind("<Button-3>", add_selected_to_queue)
+
+    window.bind("<space>", toggle_play_pause)
+    window.bind("<Tab>", lambda e: stop_song())
+    window.bind("<Escape>", lambda e: window.destroy())
+
+    window.bind("<Right>", lambda e: skip_seconds(10))
+    window.bind("<Left>", lambda e: skip_seconds(-10))
+
+    window.bind("<Control-Right>", next_song)
+    window.bind("<Control-Left>", prev_song)
+
+    window.bind("<c>", clear_queue)
+    window.bind("<d>", find_duplicates)
+    window.bind("<s>", cycle_play_mode)
+    window.bind("<i>", import_playlist_button)
+    window.bind("<e>", export_playlist_button)
+    window.bind("<z>", add_zone)
+    window.bind("<F5>", rescan_library)
+    window.bind("<F6>", rebuild_thumbnails)
+    window.bind("<F7>", analyse_loudness)
+    window.bind("<F8>", cancel_library_job)
+    window.bind("<slash>", lambda e: search_entry.focus_set())
+    window.bind("<plus>", lambda e: rate_current(1))
+    window.bind("<equal>", lambda e: rate_current(1))
+    window.bind("<minus>", lambda e: rate_current(-1))
+
+    window.bind("<F11>", toggle_profile_overlay)
+    window.bind("<F12>", toggle_profiling)
+
+
+    # =========================
+    # Startup
+    # =========================
+    update_progress()
+    if profiling_enabled:
+        probe_loop_lag()
+
+    memory_budget.set_budget(int(load_setting("memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)) * 1024 * 1024)
+    load_fingerprints()
+    load_play_stats()
+
+    last_folder = load_config()
+    if last_folder and os.path.isdir(last_folder) and not load_library_snapshot(last_folder):
+        load_music_from_folder(last_folder)
+
+    window.mainloop()
+    if active_job is not None:
+        active_job.cancel()                # finished chunks are on disk, so the job resumes next launch
+    close_all_zones()
+    save_play_stats()
+    shutdown_process_pool()